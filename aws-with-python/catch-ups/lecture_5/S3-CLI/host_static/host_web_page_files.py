@@ -1,28 +1,68 @@
 
 from pathlib import Path
-from os import getenv
+from os import getenv, scandir
+from queue import Queue
+from threading import Thread, Lock
 from bucket.crud import bucket_exists
 import pylibmagic
 import magic
 
+DEFAULT_WORKERS = 8
 
-def static_web_page_file(aws_s3_client, bucket_name, filename):
+
+def static_web_page_file(aws_s3_client, bucket_name, filename, workers=DEFAULT_WORKERS):
     if not bucket_exists(aws_s3_client, bucket_name):
         raise ValueError("Bucket does not exists")
 
     root = Path(f'static_web_page/{filename}').expanduser().resolve()
 
-    def __handle_directory(file_folder):
-        if file_folder.is_file():
-            __upload_static_web_files(aws_s3_client, bucket_name, file_folder, filename)
-            return
-        for each_path in file_folder.iterdir():
-            if each_path.is_dir():
-                __handle_directory(each_path)
-            if each_path.is_file():
-                __upload_static_web_files(aws_s3_client, bucket_name, each_path, str(each_path.relative_to(root)))
+    upload_queue = Queue(maxsize=workers * 4)
+    progress = {"queued": 0, "done": 0, "uploaded": 0, "failed": 0}
+    progress_lock = Lock()
+
+    def __consumer():
+        while True:
+            item = upload_queue.get()
+            if item is None:
+                upload_queue.task_done()
+                return
+            file_path, key = item
+            try:
+                uploaded = __upload_static_web_files(aws_s3_client, bucket_name, file_path, key)
+            except Exception as error:
+                uploaded = None
+                print(f"failed {key}: {error}")
+            with progress_lock:
+                progress["done"] += 1
+                if uploaded:
+                    progress["uploaded"] += 1
+                elif uploaded is None:
+                    progress["failed"] += 1
+                print(f"[{progress['done']}/{progress['queued']}] {key}")
+            upload_queue.task_done()
+
+    consumers = [Thread(target=__consumer, daemon=True) for _ in range(max(1, workers))]
+    for consumer in consumers:
+        consumer.start()
 
-    __handle_directory(root)
+    # producer: iterative walk, so deep trees never hit the recursion limit
+    for file_path, key in __walk_static_files(root, filename):
+        with progress_lock:
+            progress["queued"] += 1
+        upload_queue.put((file_path, key))
+
+    for _ in consumers:
+        upload_queue.put(None)
+    for consumer in consumers:
+        consumer.join()
+
+    print(
+        "uploaded: {0}, skipped: {1}, failed: {2}".format(
+            progress["uploaded"],
+            progress["done"] - progress["uploaded"] - progress["failed"],
+            progress["failed"],
+        )
+    )
 
     # public URL
     return "http://{0}.s3-website-{1}.amazonaws.com".format(
@@ -31,9 +71,23 @@ def static_web_page_file(aws_s3_client, bucket_name, filename):
     )
 
 
-def __upload_static_web_files(aws_s3_client, bucket_name, file_path, filename):
-    uploaded = {}
+def __walk_static_files(root, filename):
+    if root.is_file():
+        yield root, filename
+        return
+
+    stack = [root]
+    while stack:
+        with scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(Path(entry.path))
+                elif entry.is_file():
+                    file_path = Path(entry.path)
+                    yield file_path, file_path.relative_to(root).as_posix()
 
+
+def __upload_static_web_files(aws_s3_client, bucket_name, file_path, filename):
     mime_type = magic.from_file(file_path, mime=True)
 
     allowed_types = {
@@ -53,5 +107,6 @@ def __upload_static_web_files(aws_s3_client, bucket_name, file_path, filename):
             filename,
             ExtraArgs={'ContentType': content_type}
         )
-        uploaded[file_path] = filename
         print(content_type, mime_type)
+        return True
+    return False
@@ -1,31 +1,156 @@
 import json
+from array import array
+from os import getenv, replace
+from sys import intern
+from time import time
 from urllib.request import urlopen, Request
-from random import choice
+from random import choice, randrange
 
 headers = {
     "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36",
 }
 
+QUOTES_URL = "https://type.fit/api/quotes"
+CACHE_PATH = getenv("inspire_cache_path", ".inspire_cache.json")
+CACHE_TTL = 24 * 60 * 60
 
-def __analytics(data):
-    stats = {"quotes": 0}
-    for index, each in enumerate(data):
 
-        if not stats.get(each["author"]):
-            stats[each["author"]] = {"quote_index": [index], "quotes_avaliable": 1}
-        else:
-            stats[each["author"]]["quote_index"].append(index)
-            stats[each["author"]]["quotes_avaliable"] += 1
-        stats["quotes"] += 1
+# quote positions of author i are order[offsets[i]:offsets[i + 1]]
+# authors are ranked by quote count once per refresh, so top(k) is a slice
+class AuthorIndex:
+    def __init__(self, names, offsets, order, ranking):
+        self.names = [intern(name) for name in names]
+        self.offsets = array("I", offsets)
+        self.order = array("I", order)
+        self.ranking = array("I", ranking)
+        self.__lookup = None
 
-    return stats
+    def __count(self, i):
+        return self.offsets[i + 1] - self.offsets[i]
 
+    @property
+    def lookup(self):
+        # only author queries need it, so it is built on first use
+        if self.__lookup is None:
+            self.__lookup = {name.lower(): i for i, name in enumerate(self.names)}
+        return self.__lookup
 
-def random_quote():
-    json_result = []
-    with urlopen(
-        Request("https://type.fit/api/quotes", data=None, headers=headers)
-    ) as response:
+    @classmethod
+    def build(cls, data):
+        ids, names = {}, []
+        author_of = array("I")
+        for each in data:
+            name = str(each.get("author") or "Unknown")
+            if name.lower() not in ids:
+                ids[name.lower()] = len(names)
+                names.append(name)
+            author_of.append(ids[name.lower()])
+
+        offsets = [0] * (len(names) + 1)
+        for author in author_of:
+            offsets[author + 1] += 1
+        for i in range(len(names)):
+            offsets[i + 1] += offsets[i]
+
+        order = array("I", bytes(4 * len(author_of)))
+        cursor = array("I", offsets[:-1])
+        for position, author in enumerate(author_of):
+            order[cursor[author]] = position
+            cursor[author] += 1
+
+        ranking = sorted(
+            range(len(names)),
+            key=lambda i: offsets[i + 1] - offsets[i],
+            reverse=True,
+        )
+        return cls(names, offsets, order, ranking)
+
+    def to_dict(self):
+        return {
+            "names": self.names,
+            "offsets": self.offsets.tolist(),
+            "order": self.order.tolist(),
+            "ranking": self.ranking.tolist(),
+        }
+
+    def count(self, author):
+        i = self.lookup.get(author.lower())
+        if i is None:
+            return 0
+        return self.__count(i)
+
+    def random_position(self, author):
+        i = self.lookup.get(author.lower())
+        if i is None:
+            return None
+        return self.order[randrange(self.offsets[i], self.offsets[i + 1])]
+
+    def top(self, k):
+        return [(self.names[i], self.__count(i)) for i in self.ranking[:k]]
+
+
+def __load_cache(ttl, allow_stale=False):
+    try:
+        with open(CACHE_PATH) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if not allow_stale and time() - cache.get("fetched_at", 0) > ttl:
+        return None
+    if "authors" not in cache or "ranking" not in cache["authors"]:
+        return None
+    cache["authors"] = AuthorIndex(**cache["authors"])
+    return cache
+
+
+def refresh_quotes():
+    with urlopen(Request(QUOTES_URL, data=None, headers=headers)) as response:
         json_result = json.loads(response.read().decode())
 
-    return choice(json_result)
+    authors = AuthorIndex.build(json_result)
+    cache = {"fetched_at": time(), "quotes": json_result, "authors": authors}
+
+    with open(f"{CACHE_PATH}.tmp", "w") as file:
+        json.dump({**cache, "authors": authors.to_dict()}, file)
+    replace(f"{CACHE_PATH}.tmp", CACHE_PATH)
+
+    return cache
+
+
+def quotes_cache(ttl=CACHE_TTL, refresh=False):
+    cache = None if refresh else __load_cache(ttl)
+    if cache:
+        return cache
+
+    try:
+        return refresh_quotes()
+    except OSError:
+        # offline: fall back to whatever was cached last
+        cache = __load_cache(ttl, allow_stale=True)
+        if not cache:
+            raise
+        return cache
+
+
+def random_quote(author=None, ttl=CACHE_TTL, refresh=False):
+    cache = quotes_cache(ttl, refresh)
+
+    if author:
+        position = cache["authors"].random_position(author)
+        if position is None:
+            return None
+        return cache["quotes"][position]
+
+    return choice(cache["quotes"])
+
+
+def quote_count(author=None, ttl=CACHE_TTL, refresh=False):
+    cache = quotes_cache(ttl, refresh)
+    if author:
+        return cache["authors"].count(author)
+    return len(cache["quotes"])
+
+
+def top_authors(k, ttl=CACHE_TTL, refresh=False):
+    return quotes_cache(ttl, refresh)["authors"].top(k)
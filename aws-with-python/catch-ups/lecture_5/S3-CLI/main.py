@@ -21,11 +21,16 @@ from object.crud import (
 )
 from object.versioning import list_object_versions, rollback_to_version
 from object.policy import set_object_access_policy
-from inspire.quotes import random_quote
+from inspire.quotes import random_quote, quote_count, top_authors
 from host_static.host_web_page_files import static_web_page_file
 from host_static.host_web_configuration import set_bucket_website_policy
 
-from my_args import bucket_arguments, object_arguments, host_arguments
+from my_args import (
+    bucket_arguments,
+    object_arguments,
+    host_arguments,
+    inspire_arguments,
+)
 import argparse
 
 parser = argparse.ArgumentParser(
@@ -41,7 +46,7 @@ bucket_arguments(subparsers.add_parser("bucket", help="work with Bucket/s"))
 object_arguments(subparsers.add_parser("object", help="work with Object/s"))
 host_arguments(subparsers.add_parser("host", help="host static Website"))
 subparsers.add_parser("list_buckets", help="List already created buckets.")
-subparsers.add_parser("inspire", help="List already created buckets.")
+inspire_arguments(subparsers.add_parser("inspire", help="Random inspiring quote."))
 
 
 def main():
@@ -155,7 +160,9 @@ def main():
                     print("website configuration unassigned")
             if args.host_static:
                 print(
-                    static_web_page_file(s3_client, args.bucket_name, args.host_static)
+                    static_web_page_file(
+                        s3_client, args.bucket_name, args.host_static, args.workers
+                    )
                 )
 
         case "list_buckets":
@@ -165,7 +172,15 @@ def main():
                     print(f' Name:  {bucket["Name"]}')
 
         case "inspire":
-            print(random_quote())
+            if args.count:
+                print(quote_count(args.author, args.cache_ttl, args.refresh_cache))
+            elif args.top_authors:
+                for author, quotes in top_authors(
+                    args.top_authors, args.cache_ttl, args.refresh_cache
+                ):
+                    print(f" {author}: {quotes}")
+            else:
+                print(random_quote(args.author, args.cache_ttl, args.refresh_cache))
 
 
 if __name__ == "__main__":
@@ -1,6 +1,15 @@
+from argparse import ArgumentTypeError
 from os import getenv
 
 
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def bucket_arguments(parser):
     parser.add_argument("name", type=str, help="Pass bucket name.")
 
@@ -224,3 +233,39 @@ def host_arguments(parser):
     parser.add_argument(
         "-hs", "--host_static", type=str, help="host static file", default=None
     )
+
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        help="parallel upload workers",
+        default=8,
+    )
+
+
+def inspire_arguments(parser):
+    parser.add_argument(
+        "author", nargs="?", type=str, help="Quote author.", default=None
+    )
+
+    parser.add_argument(
+        "-ttl",
+        "--cache_ttl",
+        type=int,
+        help="seconds before cached quotes are refreshed",
+        default=24 * 60 * 60,
+    )
+
+    parser.add_argument(
+        "-rc", "--refresh_cache", help="re-download quotes", action="store_true"
+    )
+
+    parser.add_argument(
+        "-c", "--count", help="number of quotes (by author)", action="store_true"
+    )
+
+    parser.add_argument(
+        "-top", "--top_authors", type=int, help="top N authors by quotes", default=None
+    )
+
+    return parser
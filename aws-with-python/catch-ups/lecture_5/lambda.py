@@ -1,5 +1,7 @@
 import io
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
 from urllib.request import Request, urlopen
 
@@ -10,7 +12,10 @@ API_TOKEN = ""
 headers = {"Authorization": f"Bearer {API_TOKEN}"}
 API_URL = "https://api-inference.huggingface.co/models/facebook/detr-resnet-50"
 
+RECORD_CONCURRENCY = int(os.environ.get("RECORD_CONCURRENCY", "4"))
+
 s3_client = boto3.client("s3")
+record_executor = ThreadPoolExecutor(max_workers=RECORD_CONCURRENCY)
 
 
 def query_image(f):
@@ -21,30 +26,53 @@ def query_image(f):
     return result
 
 
-def lambda_handler(event, _):
-    pprint(event)
-    for record in event.get("Records"):
-        bucket = record.get("s3").get("bucket").get("name")
-        key = record.get("s3").get("object").get("key")
+def process_record(record):
+    bucket = record.get("s3").get("bucket").get("name")
+    key = record.get("s3").get("object").get("key")
+
+    print("Bucket", bucket)
+    print("Key", key)
+
+    # Download file from bucket
+    file = io.BytesIO()
+    s3_client.download_fileobj(Bucket=bucket, Key=key, Fileobj=file)
+    file.seek(0)
 
-        print("Bucket", bucket)
-        print("Key", key)
+    # Send file to Huggingface API
+    result = query_image(file)
+    print("result", result)
 
-        # Download file from bucket
-        file = io.BytesIO()
-        s3_client.download_fileobj(Bucket=bucket, Key=key, Fileobj=file)
-        file.seek(0)
+    # Upload result to bucket as json
+    result_key = key.replace(key.split(".")[-1], "json")
+    file = io.BytesIO()
+    file.write(result.encode("utf-8"))
+    file.seek(0)
 
-        # Send file to Huggingface API
-        result = query_image(file)
-        print("result", result)
+    s3_client.upload_fileobj(file, bucket, result_key)
+
+
+def lambda_handler(event, _):
+    pprint(event)
+    records = event.get("Records") or []
+    futures = {
+        record_executor.submit(process_record, record): record for record in records
+    }
 
-        # Upload result to bucket as json
-        result_key = key.replace(key.split(".")[-1], "json")
-        file = io.BytesIO()
-        file.write(result.encode("utf-8"))
-        file.seek(0)
+    failed_keys = []
+    for future, record in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            key = record["s3"]["object"]["key"]
+            print(f"Error processing record {key}: {e}")
+            failed_keys.append(key)
 
-        s3_client.upload_fileobj(file, bucket, result_key)
+    if failed_keys:
+        # S3 invokes asynchronously: a failed invocation is what Lambda
+        # retries and reports, rewriting the other results is harmless
+        raise RuntimeError(
+            f"{len(failed_keys)} of {len(records)} records failed: "
+            + ", ".join(failed_keys)
+        )
 
     return {"statusCode": 200, "body": json.dumps("Done!")}
@@ -1,5 +1,6 @@
 import json
 import os
+import time
 import uuid
 from datetime import datetime
 
@@ -7,6 +8,15 @@ import boto3
 from botocore.exceptions import ClientError
 
 DYNAMODB_TABLE = os.environ["DYNAMO_DB_TABLE"]
+# when enabled, submissions go to SQS and flush_submissions batch-writes them
+BUFFER_SUBMISSIONS = os.environ.get("BUFFER_SUBMISSIONS", "false").lower() == "true"
+SUBMISSIONS_QUEUE_URL = os.environ.get("SUBMISSIONS_QUEUE_URL")
+BATCH_WRITE_LIMIT = 25
+BATCH_WRITE_RETRIES = 5
+
+# module scope: created once per container and reused by warm invocations
+dynamodb = boto3.client("dynamodb")
+sqs = boto3.client("sqs") if BUFFER_SUBMISSIONS else None
 
 
 def lambda_handler(event, context):
@@ -15,7 +25,10 @@ def lambda_handler(event, context):
     print(json.dumps(data))
 
     try:
-        save_to_dynamodb(data)
+        if BUFFER_SUBMISSIONS:
+            enqueue_submission(data)
+        else:
+            save_to_dynamodb(data)
     except ClientError as e:
         print(e.response["Error"]["Message"])
     else:
@@ -31,10 +44,9 @@ def lambda_handler(event, context):
     }
 
 
-def save_to_dynamodb(data):
-    dynamodb = boto3.client("dynamodb")
+def build_item(data):
     timestamp = datetime.utcnow().replace(microsecond=0).isoformat()
-    item = {
+    return {
         "id": {"S": str(uuid.uuid1())},
         "name": {"S": data["name"]},
         "email": {"S": data["email"]},
@@ -45,9 +57,69 @@ def save_to_dynamodb(data):
         "createdAt": {"S": timestamp},
         "updatedAt": {"S": timestamp},
     }
+
+
+def save_to_dynamodb(data):
+    item = build_item(data)
     try:
         dynamodb.put_item(TableName=DYNAMODB_TABLE, Item=item)
     except ClientError as e:
         print(e.response["Error"]["Message"])
         raise e
     return
+
+
+def enqueue_submission(data):
+    # the item is built here so createdAt is the submission time
+    sqs.send_message(
+        QueueUrl=SUBMISSIONS_QUEUE_URL, MessageBody=json.dumps(build_item(data))
+    )
+
+
+def batch_save_to_dynamodb(items):
+    """Write items 25 at a time, retrying unprocessed ones with backoff.
+
+    Returns the items that could not be written.
+    """
+    unprocessed = []
+    for start in range(0, len(items), BATCH_WRITE_LIMIT):
+        requests = [
+            {"PutRequest": {"Item": item}}
+            for item in items[start : start + BATCH_WRITE_LIMIT]
+        ]
+
+        for attempt in range(BATCH_WRITE_RETRIES):
+            try:
+                response = dynamodb.batch_write_item(
+                    RequestItems={DYNAMODB_TABLE: requests}
+                )
+            except ClientError as e:
+                print(e.response["Error"]["Message"])
+                break
+            requests = response.get("UnprocessedItems", {}).get(DYNAMODB_TABLE, [])
+            if not requests or attempt == BATCH_WRITE_RETRIES - 1:
+                break
+            time.sleep(min(0.05 * 2**attempt, 1))
+
+        unprocessed.extend(request["PutRequest"]["Item"] for request in requests)
+
+    return unprocessed
+
+
+def flush_submissions(event, context):
+    """SQS worker: write a batch of buffered submissions in one go."""
+    messages = {}
+    items = []
+    for record in event.get("Records", []):
+        item = json.loads(record["body"])
+        messages[item["id"]["S"]] = record["messageId"]
+        items.append(item)
+
+    failed = batch_save_to_dynamodb(items)
+    print(f"Flushed {len(items) - len(failed)} of {len(items)} submissions")
+
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": messages[item["id"]["S"]]} for item in failed
+        ]
+    }
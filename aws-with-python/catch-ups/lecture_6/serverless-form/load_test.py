@@ -0,0 +1,160 @@
+"""Local load test for handler.lambda_handler.
+
+DynamoDB and SQS are replaced with in-memory stand-ins that sleep for a
+configurable latency, so the numbers show the handler's own overhead.
+
+    python load_test.py --rps 1000 --duration 10
+    python load_test.py --rps 1000 --buffered
+    python load_test.py --rps 1000 --per-request-client
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DYNAMO_DB_TABLE", "load-test")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+
+import boto3
+import handler
+
+SUBMISSION = {
+    "name": "Load Test",
+    "email": "load@test.local",
+    "phone": "555-0100",
+    "address": "Localhost",
+    "programming_languages": "Python",
+    "tools": "boto3",
+}
+
+
+class FakeDynamoDB:
+    def __init__(self, latency):
+        self.latency = latency
+        self.items = 0
+        self.lock = threading.Lock()
+
+    def put_item(self, TableName, Item):
+        time.sleep(self.latency)
+        with self.lock:
+            self.items += 1
+
+    def batch_write_item(self, RequestItems):
+        time.sleep(self.latency)
+        with self.lock:
+            self.items += sum(len(requests) for requests in RequestItems.values())
+        return {"UnprocessedItems": {}}
+
+
+class FakeSQS:
+    def __init__(self, latency):
+        self.latency = latency
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def send_message(self, QueueUrl, MessageBody):
+        time.sleep(self.latency)
+        with self.lock:
+            self.messages.append(MessageBody)
+
+
+class PerRequestClient:
+    """Mimics the old handler, which built a new boto3 client on every call.
+
+    Clients come from a session per thread, as the default session is not
+    safe to create clients from concurrently.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.local = threading.local()
+
+    def put_item(self, **kwargs):
+        if not hasattr(self.local, "session"):
+            self.local.session = boto3.session.Session()
+        self.local.session.client("dynamodb")
+        return self.backend.put_item(**kwargs)
+
+
+def percentile(values, fraction):
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def run(rps, duration, workers):
+    event = {"body": json.dumps(SUBMISSION)}
+    total = int(rps * duration)
+    latencies = [0.0] * total
+    start = time.perf_counter() + 0.1
+
+    def invoke(i):
+        # latency counts from the scheduled send time, so queueing delay
+        # caused by a slow handler is not hidden (no coordinated omission)
+        scheduled = start + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        handler.lambda_handler(event, None)
+        latencies[i] = time.perf_counter() - scheduled
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(invoke, range(total)))
+
+    elapsed = time.perf_counter() - start
+    return sorted(latencies), total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the form handler")
+    parser.add_argument("--rps", type=int, default=1000, help="Target requests/sec")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds to run")
+    parser.add_argument("--workers", type=int, default=200, help="Client threads")
+    parser.add_argument(
+        "--db-latency-ms", type=float, default=5, help="Simulated AWS call latency"
+    )
+    parser.add_argument(
+        "--buffered", action="store_true", help="Send submissions through SQS"
+    )
+    parser.add_argument(
+        "--per-request-client",
+        action="store_true",
+        help="Build a boto3 client per request, like the old handler",
+    )
+    args = parser.parse_args()
+
+    latency = args.db_latency_ms / 1000
+    dynamodb = FakeDynamoDB(latency)
+    handler.dynamodb = (
+        PerRequestClient(dynamodb) if args.per_request_client else dynamodb
+    )
+    handler.sqs = FakeSQS(latency)
+    handler.BUFFER_SUBMISSIONS = args.buffered
+    # the handler logs every request, which would dominate the timings
+    handler.print = lambda *_, **__: None
+
+    latencies, achieved = run(args.rps, args.duration, args.workers)
+
+    print(f"requests: {len(latencies)}  achieved: {achieved:.0f} req/s")
+    print(f"p50: {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"p99: {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"max: {latencies[-1] * 1000:.2f} ms")
+
+    if args.buffered:
+        messages = handler.sqs.messages
+        records = [
+            {"messageId": str(i), "body": body} for i, body in enumerate(messages)
+        ]
+        started = time.perf_counter()
+        for offset in range(0, len(records), 10):
+            handler.flush_submissions({"Records": records[offset : offset + 10]}, None)
+        print(
+            f"flushed {dynamodb.items} items in "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms (batches of 10)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
+import gzip
 import io
 import json
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
 from urllib.request import urlopen, Request
 import boto3
@@ -14,72 +19,245 @@ API_TOKEN = ""
 headers = {"Authorization": f"Bearer {API_TOKEN}"}
 API_URL = "https://api-inference.huggingface.co/models/facebook/detr-resnet-50"
 DYNAMODB_TABLE = "your-dynamo-db"
+RECORD_CONCURRENCY = int(os.environ.get("RECORD_CONCURRENCY", "4"))
+BATCH_WRITE_LIMIT = 25
+BATCH_WRITE_RETRIES = 5
+# "typed": detections as a DynamoDB list, "compressed": zlib'd JSON binary
+STORAGE_MODE = os.environ.get("STORAGE_MODE", "typed")
+# payloads above this go to S3 and the item keeps a pointer (item limit 400 KB);
+# OFFLOAD_BUCKET must not be the bucket that triggers this function, without
+# it large payloads are stored compressed in the item instead
+OFFLOAD_THRESHOLD = int(os.environ.get("OFFLOAD_THRESHOLD", str(300 * 1024)))
+OFFLOAD_BUCKET = os.environ.get("OFFLOAD_BUCKET")
+OFFLOAD_PREFIX = "detections"
+LOG_PREVIEW_CHARS = 500
 s3_client = boto3.client("s3")
+dynamodb_client = boto3.client("dynamodb")
+serializer = TypeSerializer()
+record_executor = ThreadPoolExecutor(max_workers=RECORD_CONCURRENCY)
+
+# DynamoDB attribute types of the detr-resnet-50 detection schema:
+# [{"score": 0.99, "label": "cat", "box": {"xmin": 1, "ymin": 2, ...}}]
+DETECTION_PLAN = {
+    "score": "N",
+    "label": "S",
+    "box": {"xmin": "N", "ymin": "N", "xmax": "N", "ymax": "N"},
+}
 
 
 def query_image(f):
     http_request = Request(API_URL, data=f.read(), headers=headers)
     with urlopen(http_request) as response:
         result = response.read().decode()
-        print(result)
     return result
 
 
-def save_to_dynamodb(data):
-    dynamodb = boto3.client("dynamodb")
+def serialize_value(value, plan):
+    # a missing score or coordinate must not become {"N": "None"}
+    if value is None:
+        return {"NULL": True}
+    if isinstance(plan, dict) and isinstance(value, dict):
+        return {"M": {k: serialize_value(v, plan.get(k)) for k, v in value.items()}}
+    if plan == "N":
+        return {"N": str(value)}
+    if plan == "S":
+        return {"S": str(value)}
+
+    # fields outside the plan keep the previous generic rules
+    if isinstance(value, (float, Decimal)):
+        return {"N": str(value)}
+    if isinstance(value, dict):
+        return {"M": {k: serializer.serialize(v) for k, v in value.items()}}
+    return {"S": str(value)}
+
+
+def record_item_id(record):
+    """Same id for every delivery of one S3 object version."""
+    s3 = record["s3"]
+    location = f'{s3["bucket"]["name"]}/{s3["object"]["key"]}'
+    return str(
+        uuid.uuid5(uuid.NAMESPACE_URL, f'{location}#{s3["object"].get("sequencer")}')
+    )
+
+
+def build_dynamodb_item(data, item_id=None):
     timestamp = datetime.utcnow().replace(microsecond=0).isoformat()
-    serializer = TypeSerializer()
-    dynamo_serialized_data = []
-    for item in json.loads(data, parse_float=Decimal):
-        dynamo_serialized_item = {"M": {}}
-        for key, value in item.items():
-            if isinstance(value, (float, Decimal)):
-                dynamo_serialized_item["M"][key] = {"N": str(value)}
-            elif isinstance(value, dict):
-                dynamo_serialized_item["M"][key] = {
-                    "M": {k: serializer.serialize(v) for k, v in value.items()}
-                }
-            else:
-                dynamo_serialized_item["M"][key] = {"S": str(value)}
-        dynamo_serialized_data.append(dynamo_serialized_item)
-
-    data_ready_to_be_saved = {
-        "id": {"S": str(uuid.uuid1())},
+    item_id = item_id or str(uuid.uuid1())
+    detections = json.loads(data, parse_float=Decimal)
+
+    if STORAGE_MODE == "compressed":
+        payload_attribute = "huggingJsonZ"
+        payload = {"B": zlib.compress(data.encode("utf-8"))}
+        payload_size = len(payload["B"])
+    else:
+        payload_attribute = "huggingJson"
+        payload = {
+            "L": [
+                serialize_value(detection, DETECTION_PLAN) for detection in detections
+            ]
+        }
+        # the typed list is stored roughly as large as its JSON text
+        payload_size = len(data)
+
+    item = {
+        "id": {"S": item_id},
         "createdAt": {"S": timestamp},
         "updatedAt": {"S": timestamp},
-        "huggingJson": {"L": dynamo_serialized_data},
-        "huggingFaceStringData": {"S": data},
+        "detections": {"N": str(len(detections))},
     }
-    print(json.dumps(data_ready_to_be_saved))
 
+    if payload_size > OFFLOAD_THRESHOLD and OFFLOAD_BUCKET:
+        payload_key = f"{OFFLOAD_PREFIX}/{item_id}.json.gz"
+        s3_client.put_object(
+            Bucket=OFFLOAD_BUCKET,
+            Key=payload_key,
+            Body=gzip.compress(data.encode("utf-8")),
+            ContentType="application/json",
+            ContentEncoding="gzip",
+        )
+        item["payloadLocation"] = {"S": f"s3://{OFFLOAD_BUCKET}/{payload_key}"}
+        return item
+
+    if payload_size > OFFLOAD_THRESHOLD and payload_attribute == "huggingJson":
+        payload_attribute = "huggingJsonZ"
+        payload = {"B": zlib.compress(data.encode("utf-8"))}
+        payload_size = len(payload["B"])
+    if payload_size > OFFLOAD_THRESHOLD:
+        raise ValueError(
+            f"Payload of {payload_size} bytes is too large for an item, "
+            "set OFFLOAD_BUCKET to store it in S3"
+        )
+    item[payload_attribute] = payload
+    return item
+
+
+def delete_offloaded_payload(item):
+    """Remove the S3 payload of an item that was never written."""
+    if "payloadLocation" not in item:
+        return
+    bucket, _, key = item["payloadLocation"]["S"][len("s3://") :].partition("/")
     try:
-        dynamodb.put_item(TableName=DYNAMODB_TABLE, Item=data_ready_to_be_saved)
-        pass
+        s3_client.delete_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        print(f"Warning: could not delete s3://{bucket}/{key}: {e}")
+
+
+def describe_item(item):
+    """Short log line for an item instead of dumping the whole payload."""
+    if "payloadLocation" in item:
+        where = item["payloadLocation"]["S"]
+    elif "huggingJsonZ" in item:
+        where = f'{len(item["huggingJsonZ"]["B"])} compressed bytes'
+    else:
+        where = "typed list"
+    return (
+        f'item {item["id"]["S"]}: {item["detections"]["N"]} detections, '
+        f"payload {where}"
+    )
+
+
+def save_to_dynamodb(data):
+    data_ready_to_be_saved = build_dynamodb_item(data)
+    print(describe_item(data_ready_to_be_saved))
+
+    try:
+        dynamodb_client.put_item(TableName=DYNAMODB_TABLE, Item=data_ready_to_be_saved)
     except ClientError as e:
         print(e.response["Error"]["Message"])
+        delete_offloaded_payload(data_ready_to_be_saved)
         raise e
     return
 
 
+def batch_save_to_dynamodb(items):
+    """Write items 25 at a time, retrying unprocessed ones with backoff.
+
+    Returns the items that could not be written.
+    """
+    unprocessed = []
+    for start in range(0, len(items), BATCH_WRITE_LIMIT):
+        requests = [
+            {"PutRequest": {"Item": item}}
+            for item in items[start : start + BATCH_WRITE_LIMIT]
+        ]
+
+        for attempt in range(BATCH_WRITE_RETRIES):
+            try:
+                response = dynamodb_client.batch_write_item(
+                    RequestItems={DYNAMODB_TABLE: requests}
+                )
+            except ClientError as e:
+                print(e.response["Error"]["Message"])
+                break
+            requests = response.get("UnprocessedItems", {}).get(DYNAMODB_TABLE, [])
+            if not requests or attempt == BATCH_WRITE_RETRIES - 1:
+                break
+            time.sleep(min(0.05 * 2**attempt, 1))
+
+        unprocessed.extend(request["PutRequest"]["Item"] for request in requests)
+
+    return unprocessed
+
+
+def process_record(record):
+    bucket = record.get("s3").get("bucket").get("name")
+    key = record.get("s3").get("object").get("key")
+
+    print("Bucket", bucket)
+    print("Key", key)
+
+    if bucket == OFFLOAD_BUCKET and key.startswith(f"{OFFLOAD_PREFIX}/"):
+        print(f"Skipping offloaded payload {key}")
+        return None
+
+    # Download file from bucket
+    file = io.BytesIO()
+    s3_client.download_fileobj(Bucket=bucket, Key=key, Fileobj=file)
+    file.seek(0)
+
+    # Send file to Huggingface API
+    result = query_image(file)
+    print(f"result ({len(result)} characters)", result[:LOG_PREVIEW_CHARS])
+
+    # DynamoDB item, written in batches by the handler
+    item = build_dynamodb_item(result, record_item_id(record))
+    print(describe_item(item))
+    return item
+
+
 def lambda_handler(event, _):
     pprint(event)
-    for record in event.get("Records"):
-        bucket = record.get("s3").get("bucket").get("name")
-        key = record.get("s3").get("object").get("key")
-
-        print("Bucket", bucket)
-        print("Key", key)
+    records = event.get("Records") or []
+    futures = {
+        record_executor.submit(process_record, record): record for record in records
+    }
 
-        # Download file from bucket
-        file = io.BytesIO()
-        s3_client.download_fileobj(Bucket=bucket, Key=key, Fileobj=file)
-        file.seek(0)
+    failed_keys = []
+    items = {}
+    for future, record in futures.items():
+        try:
+            item = future.result()
+            if item:
+                items[item["id"]["S"]] = (item, record)
+        except Exception as e:
+            key = record["s3"]["object"]["key"]
+            print(f"Error processing record {key}: {e}")
+            failed_keys.append(key)
 
-        # Send file to Huggingface API
-        result = query_image(file)
-        print("result", result)
+    # save data to DynamoDB
+    for item in batch_save_to_dynamodb([item for item, _ in items.values()]):
+        key = items[item["id"]["S"]][1]["s3"]["object"]["key"]
+        print(f"Error saving record {key} to DynamoDB")
+        delete_offloaded_payload(item)
+        failed_keys.append(key)
 
-        # save data to DynamoDB
-        save_to_dynamodb(result)
+    if failed_keys:
+        # S3 invokes asynchronously: a failed invocation is what Lambda
+        # retries and reports; item ids come from the S3 object, so the
+        # retry overwrites the items already written instead of duplicating
+        raise RuntimeError(
+            f"{len(failed_keys)} of {len(records)} records failed: "
+            + ", ".join(failed_keys)
+        )
 
     return {"statusCode": 200, "body": "Done!"}
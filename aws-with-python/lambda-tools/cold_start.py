@@ -0,0 +1,161 @@
+"""Cold-start budget for the Lambda handlers in this repo.
+
+Every handler module is imported in a fresh interpreter with
+``-X importtime``, which is what a Lambda cold start pays before the first
+event. The report shows the total init time and the slowest imports.
+
+    python cold_start.py
+    python cold_start.py --budget-ms 400
+    python cold_start.py --baseline HEAD~3     # before/after comparison
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HANDLERS = {
+    "lecture_6-classify": "tasks/lecture_6/task_1/lambda_function.py",
+    "catch-up-5-detect": "catch-ups/lecture_5/lambda.py",
+    "catch-up-8-dynamodb": "catch-ups/lecture_8/lambda_function.py",
+    "catch-up-6-form": "catch-ups/lecture_6/serverless-form/handler.py",
+}
+
+# module-level code reads these, real values are not needed to import
+HANDLER_ENV = {
+    "AWS_DEFAULT_REGION": "us-west-2",
+    "AWS_ACCESS_KEY_ID": "cold-start",
+    "AWS_SECRET_ACCESS_KEY": "cold-start",
+    "API_TOKEN": "cold-start",
+    "DYNAMO_DB_TABLE": "cold-start",
+}
+
+LOADER = """
+import importlib.util, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("handler_under_test", sys.argv[1])
+sys.stderr.write("HANDLER_START\\n")
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print("INIT_MS", (time.perf_counter() - started) * 1000)
+"""
+
+
+def measure(path):
+    """Import a handler once in a clean interpreter.
+
+    Returns the init time in ms and ``{module: cumulative_ms}`` for the
+    modules imported directly by the handler.
+    """
+    env = {**os.environ, **HANDLER_ENV}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", LOADER, path],
+        cwd=os.path.dirname(path),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    init_ms = float(completed.stdout.split("INIT_MS")[-1])
+    imports = {}
+    handler_lines = completed.stderr.split("HANDLER_START\n")[-1]
+    for line in handler_lines.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # top-level entries are those imported straight from the handler
+        if name.startswith(" ") and not name.startswith("  "):
+            imports[name.strip()] = int(cumulative) / 1000
+    return init_ms, imports
+
+
+def profile(path, runs):
+    samples = [measure(path) for _ in range(runs)]
+    init_ms = statistics.median(sample[0] for sample in samples)
+    imports = {}
+    for _, sample in samples:
+        for name, ms in sample.items():
+            imports.setdefault(name, []).append(ms)
+    return init_ms, {name: statistics.median(ms) for name, ms in imports.items()}
+
+
+def checkout(revision, relative_path, directory):
+    """Write a handler as it was at ``revision`` and return its path."""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:./{relative_path}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    path = os.path.join(directory, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(source)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Lambda handler init time")
+    parser.add_argument(
+        "handlers",
+        nargs="*",
+        help=f"Handlers to measure: {', '.join(HANDLERS)} (default: all)",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Imports per handler")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports shown")
+    parser.add_argument(
+        "--budget-ms", type=float, default=None, help="Fail if init exceeds this"
+    )
+    parser.add_argument(
+        "--baseline", default=None, help="Git revision to compare against"
+    )
+    args = parser.parse_args()
+
+    for name in args.handlers:
+        if name not in HANDLERS:
+            parser.error(f"unknown handler {name}")
+
+    over_budget = []
+    with tempfile.TemporaryDirectory() as baseline_dir:
+        for name in args.handlers or HANDLERS:
+            relative_path = HANDLERS[name]
+            try:
+                init_ms, imports = profile(os.path.join(ROOT, relative_path), args.runs)
+            except RuntimeError as e:
+                print(f"{name:<22} failed to import: {e}")
+                over_budget.append(name)
+                continue
+
+            line = f"{name:<22} init {init_ms:8.1f} ms"
+            if args.baseline:
+                before_path = checkout(args.baseline, relative_path, baseline_dir)
+                try:
+                    before_ms, _ = profile(before_path, args.runs)
+                    line += f"  (was {before_ms:.1f} ms, {init_ms - before_ms:+.1f} ms)"
+                except RuntimeError as e:
+                    line += f"  (baseline failed to import: {e})"
+            print(line)
+
+            slowest = sorted(imports.items(), key=lambda item: -item[1])
+            for module, ms in slowest[: args.top]:
+                print(f"    {ms:8.1f} ms  {module}")
+
+            if args.budget_ms is not None and init_ms > args.budget_ms:
+                over_budget.append(name)
+
+    if over_budget:
+        print(f"Failed or over budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
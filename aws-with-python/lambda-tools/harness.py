@@ -0,0 +1,273 @@
+"""Run the S3-triggered Lambda handlers locally with synthetic events.
+
+S3, DynamoDB and the Hugging Face inference API are replaced by in-memory
+stand-ins with configurable latency. Each handler is invoked repeatedly
+and the report shows record throughput, p50/p99 invocation latency and
+peak Python memory (tracemalloc).
+
+    python harness.py --records 10 --invocations 20
+    python harness.py lecture_6-classify --duplicates 0.5
+    python harness.py --max-p99-ms 2000        # exit 1 on regression
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+import uuid
+
+from cold_start import HANDLER_ENV, HANDLERS, ROOT
+
+import boto3
+from botocore.exceptions import ClientError
+
+S3_HANDLERS = ["lecture_6-classify", "catch-up-5-detect", "catch-up-8-dynamodb"]
+
+DETECTION = {
+    "score": 0.9987,
+    "label": "cat",
+    "box": {"xmin": 12, "ymin": 40, "xmax": 310, "ymax": 280},
+}
+
+
+class FakeS3:
+    def __init__(self, latency):
+        self.latency = latency
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def __body(self, Bucket, Key):
+        time.sleep(self.latency)
+        try:
+            return self.objects[(Bucket, Key)]
+        except KeyError:
+            raise ClientError(
+                {"Error": {"Code": "NoSuchKey", "Message": Key}}, "GetObject"
+            )
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.__body(Bucket, Key))}
+
+    def download_fileobj(self, Bucket, Key, Fileobj):
+        Fileobj.write(self.__body(Bucket, Key))
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.objects[(Bucket, Key)] = bytes(Body)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, **kwargs):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read())
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        body = self.__body(CopySource["Bucket"], CopySource["Key"])
+        with self.lock:
+            self.objects[(Bucket, Key)] = body
+
+
+class FakeDynamoDB:
+    def __init__(self, latency):
+        self.latency = latency
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def put_item(self, TableName, Item):
+        time.sleep(self.latency)
+        with self.lock:
+            self.items[json.dumps(Item.get("id") or Item.get("cacheKey"))] = Item
+
+    def get_item(self, TableName, Key):
+        time.sleep(self.latency)
+        return {"Item": self.items.get(json.dumps(next(iter(Key.values()))))}
+
+    def batch_write_item(self, RequestItems):
+        time.sleep(self.latency)
+        for table, requests in RequestItems.items():
+            for request in requests:
+                self.put_item(table, request["PutRequest"]["Item"])
+        return {"UnprocessedItems": {}}
+
+
+class FakeInferenceResponse:
+    def __init__(self, data):
+        self.status = 200
+        self.data = data
+
+    def read(self):
+        return self.data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+class FakeInference:
+    """Stands in for both urlopen and the urllib3 pool used by the handlers."""
+
+    def __init__(self, latency, detections):
+        self.latency = latency
+        self.body = json.dumps([DETECTION] * detections).encode()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, request, timeout=None):
+        return self.request("POST", request.full_url)
+
+    def request(self, method, url, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+        return FakeInferenceResponse(self.body)
+
+
+def make_event(records, bucket="harness-bucket", extension="jpg"):
+    """Synthetic S3 put notification with ``records`` records."""
+    event_records = []
+    for _ in range(records):
+        key = f"uploads/{uuid.uuid4().hex}.{extension}"
+        record = {
+            "eventVersion": "2.1",
+            "eventSource": "aws:s3",
+            "eventName": "ObjectCreated:Put",
+            "s3": {
+                "bucket": {"name": bucket, "arn": f"arn:aws:s3:::{bucket}"},
+                "object": {"key": key, "sequencer": uuid.uuid4().hex[:16]},
+            },
+        }
+        event_records.append(record)
+    return {"Records": event_records}
+
+
+def seed_objects(s3, event, image_bytes, duplicates):
+    """Put an image for every record; ``duplicates`` of them share content."""
+    shared = os.urandom(image_bytes)
+    for record in event["Records"]:
+        body = shared if random.random() < duplicates else os.urandom(image_bytes)
+        bucket = record["s3"]["bucket"]["name"]
+        s3.objects[(bucket, record["s3"]["object"]["key"])] = body
+
+
+def load_handler(name, s3, dynamodb, inference):
+    """Import a handler with its AWS clients and HTTP calls replaced."""
+    os.environ.update(HANDLER_ENV)
+    clients = {"s3": s3, "dynamodb": dynamodb}
+    real_client = boto3.client
+    boto3.client = lambda service, *args, **kwargs: clients[service]
+    try:
+        path = os.path.join(ROOT, HANDLERS[name])
+        spec = importlib.util.spec_from_file_location(f"harness_{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        boto3.client = real_client
+
+    if hasattr(module, "inference_pool"):
+        module.inference_pool = inference
+    if hasattr(module, "urlopen"):
+        module.urlopen = inference
+    if getattr(module, "CACHE_TABLE", None):
+        module.dynamodb_client = dynamodb
+    # handler logging would dominate the timings
+    module.print = lambda *_, **__: None
+    return module
+
+
+def run_handler(name, args):
+    s3 = FakeS3(args.s3_ms / 1000)
+    dynamodb = FakeDynamoDB(args.dynamodb_ms / 1000)
+    inference = FakeInference(args.inference_ms / 1000, args.detections)
+    module = load_handler(name, s3, dynamodb, inference)
+
+    events = []
+    for _ in range(args.invocations):
+        event = make_event(args.records)
+        seed_objects(s3, event, args.image_kb * 1024, args.duplicates)
+        events.append(event)
+
+    latencies = []
+    failed = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    for event in events:
+        invoked = time.perf_counter()
+        try:
+            module.lambda_handler(event, None)
+        except RuntimeError:
+            # handlers fail the whole invocation so that Lambda retries it
+            failed += 1
+        latencies.append(time.perf_counter() - invoked)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    p99_index = min(len(latencies) - 1, int(round(0.99 * (len(latencies) - 1))))
+    return {
+        "handler": name,
+        "records_per_sec": args.records * args.invocations / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[p99_index] * 1000,
+        "peak_mb": peak / 1024 / 1024,
+        "inference_calls": inference.calls,
+        "failed_invocations": failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Lambda handlers locally")
+    parser.add_argument(
+        "handlers",
+        nargs="*",
+        help=f"Handlers to run: {', '.join(S3_HANDLERS)} (default: all)",
+    )
+    parser.add_argument("--records", type=int, default=10, help="Records per event")
+    parser.add_argument("--invocations", type=int, default=10, help="Events per run")
+    parser.add_argument("--image-kb", type=int, default=200, help="Image size")
+    parser.add_argument(
+        "--duplicates", type=float, default=0.0, help="Share of identical images"
+    )
+    parser.add_argument("--detections", type=int, default=20, help="Per result")
+    parser.add_argument("--inference-ms", type=float, default=300)
+    parser.add_argument("--s3-ms", type=float, default=20)
+    parser.add_argument("--dynamodb-ms", type=float, default=10)
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    parser.add_argument(
+        "--max-p99-ms", type=float, default=None, help="Exit 1 if p99 exceeds this"
+    )
+    args = parser.parse_args()
+
+    for name in args.handlers:
+        if name not in S3_HANDLERS:
+            parser.error(f"unknown handler {name}")
+
+    results = [run_handler(name, args) for name in args.handlers or S3_HANDLERS]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(
+                f'{result["handler"]:<22} {result["records_per_sec"]:8.1f} rec/s  '
+                f'p50 {result["p50_ms"]:8.1f} ms  p99 {result["p99_ms"]:8.1f} ms  '
+                f'peak {result["peak_mb"]:6.1f} MB  '
+                f'inference calls {result["inference_calls"]}  '
+                f'failed invocations {result["failed_invocations"]}'
+            )
+
+    if args.max_p99_ms is not None and any(
+        result["p99_ms"] > args.max_p99_ms for result in results
+    ):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,27 +1,164 @@
 import argparse
 import ipaddress
-import math
+import json
 import os
 import secrets
+import sqlite3
 import string
+import subprocess
+import sys
+import threading
+import time
+from collections import ChainMap
+from functools import lru_cache
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 
 import boto3
 import requests
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
-
-def init_client(service="ec2"):
-    """Initializes and returns an AWS client for specified service."""
+# settings below come from .env too, not only from the shell
+load_dotenv()
+
+# default quota, the VPC's main route table counts towards it
+ROUTE_TABLES_PER_VPC = 200
+# --route-tables and the route_tables key of a spec
+ROUTE_TABLE_TOPOLOGIES = ("per-subnet", "shared")
+# smallest and largest prefix length EC2 accepts for a subnet
+SUBNET_PREFIXES = (16, 28)
+
+INVENTORY_PATH = os.getenv("inventory_path", ".ec2_inventory.sqlite")
+INVENTORY_TTL = 15 * 60
+# bumped whenever the cache tables change, older caches are rebuilt
+INVENTORY_SCHEMA = 2
+# kind: (describe operation, result key, id field)
+INVENTORY_KINDS = {
+    "vpcs": ("describe_vpcs", "Vpcs", "VpcId"),
+    "subnets": ("describe_subnets", "Subnets", "SubnetId"),
+    "route_tables": ("describe_route_tables", "RouteTables", "RouteTableId"),
+    "internet_gateways": (
+        "describe_internet_gateways",
+        "InternetGateways",
+        "InternetGatewayId",
+    ),
+    "security_groups": ("describe_security_groups", "SecurityGroups", "GroupId"),
+    "instances": ("describe_instances", "Reservations", "InstanceId"),
+}
+
+REGION_CACHE_PATH = os.getenv("region_cache_path", ".ec2_regions.json")
+REGION_CACHE_TTL = 24 * 60 * 60
+REGION_CACHE_VERSION = 2
+# cached per account and region, each fetched only when a command needs it
+REGION_FIELDS = ("azs", "default_vpc", "amis")
+# image family: AMI name pattern, the newest match is kept per region
+AMI_NAME_PATTERNS = {"amazon-linux-2": "amzn2-ami-hvm-*-x86_64-gp2"}
+
+# subcommands run once per region, each in its own process, with --regions
+FAN_OUT_COMMANDS = ("create-vpc", "plan", "apply")
+# set in those processes so they never fan out again
+FAN_OUT_CHILD_ENV = "BTU_FANOUT_CHILD"
+
+# kind: (describe operation, result key, id field, id filter)
+READY_KINDS = {
+    "vpc": ("describe_vpcs", "Vpcs", "VpcId", "vpc-id"),
+    "subnet": ("describe_subnets", "Subnets", "SubnetId", "subnet-id"),
+}
+# most filters accept at most 200 values
+READY_BATCH_SIZE = 200
+
+
+def init_client(service="ec2", region_name=None):
+    """Initializes and returns an AWS client for specified service.
+
+    The region defaults to aws_region_name from the environment.
+    """
     load_dotenv()
 
     credentials = {
         "aws_access_key_id": os.getenv("aws_access_key_id"),
         "aws_secret_access_key": os.getenv("aws_secret_access_key"),
         "aws_session_token": os.getenv("aws_session_token"),
-        "region_name": os.getenv("aws_region_name"),
+        "region_name": region_name or os.getenv("aws_region_name"),
     }
 
-    return boto3.client(service, **credentials)
+    # adaptive retries back off client-side when AWS starts throttling
+    config = Config(retries={"mode": "adaptive", "max_attempts": 10})
+
+    return boto3.client(service, config=config, **credentials)
+
+
+@lru_cache(maxsize=None)
+def get_account_id():
+    """AWS account of the configured credentials, looked up once per run."""
+    return init_client("sts").get_caller_identity()["Account"]
+
+
+class RateLimitedClient:
+    """Wraps a boto3 client so API calls from all threads share a rate limit."""
+
+    def __init__(self, client, calls_per_second):
+        self._client = client
+        self._interval = 1 / calls_per_second
+        self._next_call = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _wait_turn(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or name in ("get_waiter", "get_paginator"):
+            return attribute
+
+        def call(*args, **kwargs):
+            self._wait_turn()
+            return attribute(*args, **kwargs)
+
+        return call
+
+
+def run_task_graph(tasks, max_workers=10):
+    """Run tasks as soon as their dependencies have finished.
+
+    tasks maps a name to (dependencies, function); each function receives
+    the results of the tasks finished so far. Returns all results by name.
+    """
+    results = {}
+    pending = dict(tasks)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            ready = [
+                name
+                for name, (dependencies, _) in pending.items()
+                if all(dependency in results for dependency in dependencies)
+            ]
+            for name in ready:
+                _, function = pending.pop(name)
+                running[executor.submit(function, results)] = name
+
+            if not running:
+                raise ValueError(f"Unresolvable task dependencies: {list(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+
+    return results
 
 
 def get_my_public_ip():
@@ -34,24 +171,151 @@ def get_my_public_ip():
         return None
 
 
-def get_available_azs(client, max_azs=None):
-    """Get available Availability Zones in the current region"""
-    try:
-        response = client.describe_availability_zones(
+def describe_region(client, field):
+    """Look up one REGION_FIELDS entry of the client's region."""
+    if field == "azs":
+        zones = client.describe_availability_zones(
             Filters=[{"Name": "state", "Values": ["available"]}]
+        )["AvailabilityZones"]
+        # zone name: zone id, in the order EC2 lists them
+        return {zone["ZoneName"]: zone["ZoneId"] for zone in zones}
+
+    if field == "default_vpc":
+        vpcs = client.describe_vpcs(
+            Filters=[{"Name": "is-default", "Values": ["true"]}]
+        )["Vpcs"]
+        return vpcs[0]["VpcId"] if vpcs else None
+
+    amis = {}
+    for family, name_pattern in AMI_NAME_PATTERNS.items():
+        images = client.describe_images(
+            Owners=["amazon"],
+            Filters=[
+                {"Name": "name", "Values": [name_pattern]},
+                {"Name": "state", "Values": ["available"]},
+                {"Name": "architecture", "Values": ["x86_64"]},
+            ],
+        )["Images"]
+        amis[family] = (
+            max(images, key=lambda image: image["CreationDate"])["ImageId"]
+            if images
+            else None
         )
+    return amis
 
-        azs = [az["ZoneName"] for az in response["AvailabilityZones"]]
 
-        if max_azs:
-            azs = azs[:max_azs]
+def read_region_cache():
+    """Return the on-disk metadata as {account: {region: {field: entry}}}.
 
-        print(f"Available Availability Zones: {', '.join(azs)}")
-        return azs
-    except Exception as e:
-        print(f"Error getting availability zones: {e}")
+    Each entry holds the value and when it was fetched. Without a cache, or
+    with one in an older layout, this is {}.
+    """
+    try:
+        with open(REGION_CACHE_PATH) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != REGION_CACHE_VERSION:
+        return {}
+    return cache["accounts"]
+
+
+def warm_region_metadata(
+    clients, fields=REGION_FIELDS, ttl=REGION_CACHE_TTL, refresh=False
+):
+    """Return {region: {field: entry}} for each region in clients.
+
+    clients maps regions to EC2 clients. Only the requested fields are
+    described, those missing from the cache or older than ttl, all
+    concurrently, and written back in one go. A field that cannot be
+    described is still served stale, if it was cached before.
+    """
+    account = get_account_id()
+    cached = read_region_cache().get(account, {})
+    stale = [
+        (region, field)
+        for region in clients
+        for field in fields
+        if refresh
+        or time.time() - cached.get(region, {}).get(field, {}).get("fetched_at", 0)
+        > ttl
+    ]
+
+    def fetch(region, field):
+        try:
+            return {
+                "value": describe_region(clients[region], field),
+                "fetched_at": time.time(),
+            }
+        except Exception as e:
+            print(f"Error describing {field} of region {region}: {e}")
+            return None
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+            futures = {key: executor.submit(fetch, *key) for key in stale}
+        fetched = {key: future.result() for key, future in futures.items()}
+        fetched = {key: entry for key, entry in fetched.items() if entry}
+        if fetched:
+            # re-read so what another run wrote meanwhile is kept
+            accounts = read_region_cache()
+            for (region, field), entry in fetched.items():
+                accounts.setdefault(account, {}).setdefault(region, {})[field] = entry
+            cached = accounts[account]
+            # per process, regions fanned out with --regions write concurrently
+            temp_path = f"{REGION_CACHE_PATH}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as cache_file:
+                json.dump(
+                    {"version": REGION_CACHE_VERSION, "accounts": accounts},
+                    cache_file,
+                    indent=2,
+                )
+            os.replace(temp_path, REGION_CACHE_PATH)
+
+    return {
+        region: {
+            field: cached[region][field]
+            for field in fields
+            if field in cached.get(region, {})
+        }
+        for region in clients
+    }
+
+
+def get_region_metadata(client, field, ttl=REGION_CACHE_TTL, refresh=False):
+    """One cached field of the client's region, or None if unavailable."""
+    region = client.meta.region_name
+    metadata = warm_region_metadata({region: client}, (field,), ttl, refresh)
+    entry = metadata[region].get(field)
+    return entry["value"] if entry else None
+
+
+def get_available_azs(client, max_azs=None):
+    """Get available Availability Zones in the current region"""
+    zones = get_region_metadata(client, "azs")
+    if not zones:
+        print("Error getting availability zones")
         return []
 
+    azs = list(zones)
+    if max_azs:
+        azs = azs[:max_azs]
+
+    print(f"Available Availability Zones: {', '.join(azs)}")
+    return azs
+
+
+def resolve_vpc_id(client, vpc_id):
+    """Returns vpc_id, with 'default' replaced by the region's default VPC."""
+    if vpc_id != "default":
+        return vpc_id
+
+    default_vpc = get_region_metadata(client, "default_vpc")
+    if not default_vpc:
+        print("Error: This region has no default VPC")
+        exit(1)
+    return default_vpc
+
 
 def is_valid_cidr(cidr):
     """Checks if a CIDR is valid."""
@@ -62,22 +326,85 @@ def is_valid_cidr(cidr):
         return False
 
 
-def add_name_tag(client, resource_id, name_value):
-    """Adds a 'Name' tag to an AWS resource."""
+def name_tag_specification(resource_type, name_value):
+    """Returns TagSpecifications that set a 'Name' tag at creation time."""
+    return [
+        {
+            "ResourceType": resource_type,
+            "Tags": [{"Key": "Name", "Value": name_value}],
+        }
+    ]
+
+
+def tag_resources(client, resource_ids, tags):
+    """Applies the same tags to many existing resources in bulk."""
+    resource_ids = list(resource_ids)
+    tag_list = [{"Key": key, "Value": value} for key, value in tags.items()]
     try:
-        client.create_tags(
-            Resources=[resource_id],
-            Tags=[{"Key": "Name", "Value": name_value}],
-        )
-        print(f"Successfully tagged resource {resource_id} with Name: {name_value}")
+        # create_tags accepts up to 1000 resource IDs per call
+        for start in range(0, len(resource_ids), 1000):
+            client.create_tags(
+                Resources=resource_ids[start : start + 1000], Tags=tag_list
+            )
+        print(f"Successfully tagged {len(resource_ids)} resource(s) with {tags}")
+        return True
     except Exception as e:
-        print(f"Error tagging resource {resource_id}: {e}")
+        print(f"Error tagging resources: {e}")
+        return False
+
+
+def wait_until_available(
+    client, kind, resource_ids, first_delay=0.5, max_delay=10, timeout=600
+):
+    """Waits for every resource to reach the 'available' state.
+
+    All IDs are polled together, READY_BATCH_SIZE per describe call, and
+    only those still pending are asked about again. The delay grows while
+    nothing changes and is kept while resources keep becoming available.
+    Filters are used instead of IDs so that resources which are not yet
+    visible do not fail the whole call. Returns the describe calls made.
+    """
+    operation, result_key, id_field, id_filter = READY_KINDS[kind]
+    pending = set(resource_ids)
+    delay = first_delay
+    deadline = time.monotonic() + timeout
+    calls = 0
+
+    while pending:
+        ids = sorted(pending)
+        for start in range(0, len(ids), READY_BATCH_SIZE):
+            batch = ids[start : start + READY_BATCH_SIZE]
+            response = getattr(client, operation)(
+                Filters=[{"Name": id_filter, "Values": batch}]
+            )
+            calls += 1
+            for resource in response[result_key]:
+                if resource.get("State") == "available":
+                    pending.discard(resource[id_field])
+
+        if not pending:
+            break
+        if time.monotonic() + delay > deadline:
+            print(
+                f"Error: {len(pending)} {kind}(s) not available after "
+                f"{timeout}s: {', '.join(sorted(pending))}"
+            )
+            exit(1)
+        time.sleep(delay)
+        if len(pending) == len(ids):
+            delay = min(delay * 2, max_delay)
+
+    print(f"{len(resource_ids)} {kind}(s) available after {calls} describe call(s)")
+    return calls
 
 
 def create_vpc(client, vpc_cidr, vpc_name):
-    """Creates a VPC and tags it."""
+    """Creates a VPC tagged with its name."""
     try:
-        result = client.create_vpc(CidrBlock=vpc_cidr)
+        result = client.create_vpc(
+            CidrBlock=vpc_cidr,
+            TagSpecifications=name_tag_specification("vpc", vpc_name),
+        )
         vpc_id = result.get("Vpc", {}).get("VpcId")
 
         if not vpc_id:
@@ -86,9 +413,7 @@ def create_vpc(client, vpc_cidr, vpc_name):
 
         print(f"VPC created with ID: {vpc_id} and CIDR: {vpc_cidr}")
 
-        waiter = client.get_waiter("vpc_available")
-        waiter.wait(VpcIds=[vpc_id])
-        print(f"VPC {vpc_id} is now available.")
+        wait_until_available(client, "vpc", [vpc_id])
 
         try:
             client.modify_vpc_attribute(
@@ -103,8 +428,6 @@ def create_vpc(client, vpc_cidr, vpc_name):
         except Exception as e:
             print(f"Warning: Could not enable DNS settings: {e}")
 
-        add_name_tag(client, vpc_id, vpc_name)
-
         return vpc_id
     except Exception as e:
         print(f"Error creating VPC: {e}")
@@ -112,9 +435,13 @@ def create_vpc(client, vpc_cidr, vpc_name):
 
 
 def create_and_attach_igw(client, vpc_id, vpc_name):
-    """Creates an Internet Gateway, tags it, and attaches it to the VPC."""
+    """Creates a tagged Internet Gateway and attaches it to the VPC."""
     try:
-        result = client.create_internet_gateway()
+        result = client.create_internet_gateway(
+            TagSpecifications=name_tag_specification(
+                "internet-gateway", f"{vpc_name}-IGW"
+            )
+        )
         igw_id = result.get("InternetGateway", {}).get("InternetGatewayId")
 
         if not igw_id:
@@ -123,8 +450,6 @@ def create_and_attach_igw(client, vpc_id, vpc_name):
 
         print(f"Internet Gateway created with ID: {igw_id}")
 
-        add_name_tag(client, igw_id, f"{vpc_name}-IGW")
-
         client.attach_internet_gateway(InternetGatewayId=igw_id, VpcId=vpc_id)
         print(f"Attached Internet Gateway {igw_id} to VPC {vpc_id}")
 
@@ -135,9 +460,17 @@ def create_and_attach_igw(client, vpc_id, vpc_name):
 
 
 def create_subnet(client, vpc_id, subnet_cidr, subnet_name_tag, availability_zone=None):
-    """Creates a subnet within the VPC and tags it."""
+    """Creates a tagged subnet within the VPC.
+
+    The subnet may still be pending; callers wait for all the subnets they
+    created at once with wait_until_available.
+    """
     try:
-        subnet_params = {"VpcId": vpc_id, "CidrBlock": subnet_cidr}
+        subnet_params = {
+            "VpcId": vpc_id,
+            "CidrBlock": subnet_cidr,
+            "TagSpecifications": name_tag_specification("subnet", subnet_name_tag),
+        }
 
         if availability_zone:
             subnet_params["AvailabilityZone"] = availability_zone
@@ -154,12 +487,6 @@ def create_subnet(client, vpc_id, subnet_cidr, subnet_name_tag, availability_zon
             f"Subnet created with ID: {subnet_id} and CIDR: {subnet_cidr} in VPC {vpc_id} (AZ: {actual_az})"
         )
 
-        waiter = client.get_waiter("subnet_available")
-        waiter.wait(SubnetIds=[subnet_id])
-        print(f"Subnet {subnet_id} is now available.")
-
-        add_name_tag(client, subnet_id, subnet_name_tag)
-
         return subnet_id
     except Exception as e:
         print(f"Error creating subnet {subnet_name_tag} with CIDR {subnet_cidr}: {e}")
@@ -169,7 +496,12 @@ def create_subnet(client, vpc_id, subnet_cidr, subnet_name_tag, availability_zon
 def create_route_table(client, vpc_id, route_table_name_tag, is_public, igw_id=None):
     """Creates a route table. If public, adds a route to the IGW."""
     try:
-        result = client.create_route_table(VpcId=vpc_id)
+        result = client.create_route_table(
+            VpcId=vpc_id,
+            TagSpecifications=name_tag_specification(
+                "route-table", route_table_name_tag
+            ),
+        )
         rt_id = result.get("RouteTable", {}).get("RouteTableId")
 
         if not rt_id:
@@ -178,8 +510,6 @@ def create_route_table(client, vpc_id, route_table_name_tag, is_public, igw_id=N
 
         print(f"Route Table created with ID: {rt_id} for VPC {vpc_id}")
 
-        add_name_tag(client, rt_id, route_table_name_tag)
-
         if is_public:
             client.create_route(
                 RouteTableId=rt_id,
@@ -206,24 +536,186 @@ def associate_route_table_to_subnet(client, route_table_id, subnet_id):
         exit(1)
 
 
-def calculate_subnet_cidr(vpc_cidr, subnet_index, is_public, num_subnets):
-    """Calculate CIDR block for a subnet based on its index."""
-    vpc_network = ipaddress.ip_network(vpc_cidr)
-    subnet_bits = math.ceil(math.log2(num_subnets))
-    new_prefix_length = vpc_network.prefixlen + subnet_bits + 1
+def format_cidr(address, prefix):
+    """Formats an integer IPv4 address and prefix length as a CIDR string."""
+    octets = (address >> 24, address >> 16 & 255, address >> 8 & 255, address & 255)
+    return f"{'.'.join(map(str, octets))}/{prefix}"
 
-    if is_public:
-        base_address = vpc_network.network_address
-    else:
-        half_way = vpc_network.network_address + (2 ** (32 - vpc_network.prefixlen - 1))
-        base_address = half_way
 
-    network_address = base_address + (subnet_index * (2 ** (32 - new_prefix_length)))
+def pair_subnet_requests(
+    vpc_name, vpc_cidr, num_subnets, public_prefix=None, private_prefix=None
+):
+    """Describe num_subnets public/private subnet pairs for plan_subnets.
 
-    return str(
-        ipaddress.ip_network(f"{network_address}/{new_prefix_length}", strict=False)
+    Prefixes default to the smallest size that fits every pair in the VPC.
+    """
+    vpc_prefix = ipaddress.ip_network(vpc_cidr).prefixlen
+    fitted_prefix = max(
+        vpc_prefix + (num_subnets * 2 - 1).bit_length(), SUBNET_PREFIXES[0]
     )
 
+    subnets = []
+    for kind, prefix in (("public", public_prefix), ("private", private_prefix)):
+        for i in range(num_subnets):
+            subnets.append(
+                {
+                    "name": f"{vpc_name}-{kind}-subnet-{i+1}",
+                    "prefix": prefix or fitted_prefix,
+                    "public": kind == "public",
+                }
+            )
+    return subnets
+
+
+def plan_subnets(vpc_cidr, subnets, azs, reserved=()):
+    """Lay out every subnet of a VPC in one pass.
+
+    subnets is a list of {"name", "prefix", "public"} dicts, optionally with
+    an "az"; the others are spread round-robin over azs, separately for
+    public and private subnets. Reserved CIDRs are never allocated.
+    Largest subnets are placed first, each at the lowest aligned address
+    that is still free. Raises ValueError if the subnets do not fit.
+    """
+    vpc = ipaddress.ip_network(vpc_cidr)
+    vpc_start = int(vpc.network_address)
+    free = [(vpc_start, vpc_start + vpc.num_addresses)]
+
+    for cidr in reserved:
+        network = ipaddress.ip_network(cidr)
+        if not network.subnet_of(vpc):
+            raise ValueError(f"Reserved range {cidr} is outside {vpc_cidr}")
+        reserved_start = int(network.network_address)
+        reserved_end = reserved_start + network.num_addresses
+        free = [
+            piece
+            for start, end in free
+            for piece in (
+                (start, min(end, reserved_start)),
+                (max(start, reserved_end), end),
+            )
+            if piece[0] < piece[1]
+        ]
+
+    smallest_prefix = max(vpc.prefixlen, SUBNET_PREFIXES[0])
+    addresses = [None] * len(subnets)
+    order = sorted(range(len(subnets)), key=lambda index: subnets[index]["prefix"])
+    for index in order:
+        prefix = subnets[index]["prefix"]
+        if not smallest_prefix <= prefix <= SUBNET_PREFIXES[1]:
+            raise ValueError(
+                f"Subnet {subnets[index]['name']} has prefix /{prefix}, "
+                f"expected /{smallest_prefix} to /{SUBNET_PREFIXES[1]}"
+            )
+        size = 1 << (32 - prefix)
+        for position, (start, end) in enumerate(free):
+            address = (start + size - 1) & -size
+            if address + size <= end:
+                free[position : position + 1] = [
+                    piece
+                    for piece in ((start, address), (address + size, end))
+                    if piece[0] < piece[1]
+                ]
+                addresses[index] = address
+                break
+        else:
+            raise ValueError(
+                f"No room for subnet {subnets[index]['name']} (/{prefix}) in {vpc_cidr}"
+            )
+
+    spread = {True: 0, False: 0}
+    planned = []
+    for subnet, address in zip(subnets, addresses):
+        az = subnet.get("az")
+        if not az:
+            az = azs[spread[subnet["public"]] % len(azs)]
+            spread[subnet["public"]] += 1
+        planned.append(
+            {
+                "name": subnet["name"],
+                "cidr": format_cidr(address, subnet["prefix"]),
+                "az": az,
+                "public": subnet["public"],
+            }
+        )
+
+    plan = {
+        "vpc_cidr": str(vpc),
+        "azs": list(azs),
+        "reserved": [str(ipaddress.ip_network(cidr)) for cidr in reserved],
+        "subnets": planned,
+        "free_addresses": sum(end - start for start, end in free),
+    }
+    validate_plan(plan)
+    return plan
+
+
+def validate_plan(plan):
+    """Check a subnet plan before anything is created. Raises ValueError."""
+    vpc = ipaddress.ip_network(plan["vpc_cidr"])
+    vpc_start = int(vpc.network_address)
+    vpc_end = vpc_start + vpc.num_addresses
+
+    ranges = []
+    for cidr in plan.get("reserved", []):
+        network = ipaddress.ip_network(cidr)
+        start = int(network.network_address)
+        ranges.append((start, start + network.num_addresses, f"reserved {cidr}"))
+
+    names = set()
+    for index, subnet in enumerate(plan["subnets"]):
+        if not isinstance(subnet, dict):
+            raise ValueError(f"Subnet {index} must be a mapping")
+        for key, kind in (("name", str), ("cidr", str), ("az", str), ("public", bool)):
+            if not isinstance(subnet.get(key), kind):
+                raise ValueError(
+                    f"Subnet {subnet.get('name', index)} needs a {kind.__name__} "
+                    f"'{key}'"
+                )
+        if subnet["name"] in names:
+            raise ValueError(f"Duplicate subnet name {subnet['name']}")
+        names.add(subnet["name"])
+
+        # strict parsing rejects CIDRs with host bits set
+        network = ipaddress.ip_network(subnet["cidr"])
+        if not SUBNET_PREFIXES[0] <= network.prefixlen <= SUBNET_PREFIXES[1]:
+            raise ValueError(
+                f"Subnet {subnet['name']} {subnet['cidr']} must be between "
+                f"/{SUBNET_PREFIXES[0]} and /{SUBNET_PREFIXES[1]}"
+            )
+        start = int(network.network_address)
+        end = start + network.num_addresses
+        if start < vpc_start or end > vpc_end:
+            raise ValueError(
+                f"Subnet {subnet['name']} {subnet['cidr']} is outside {vpc}"
+            )
+        if plan.get("azs") and subnet["az"] not in plan["azs"]:
+            raise ValueError(f"Subnet {subnet['name']} uses unknown AZ {subnet['az']}")
+        ranges.append((start, end, f"subnet {subnet['name']} {subnet['cidr']}"))
+
+    azs = plan.get("azs") or {subnet["az"] for subnet in plan["subnets"]}
+    if len(set(azs)) < 2:
+        raise ValueError(
+            "At least 2 Availability Zones are required for RDS compatibility"
+        )
+
+    # after sorting, any overlap shows up between neighbours
+    ranges.sort()
+    for (_, previous_end, previous), (start, _, current) in zip(ranges, ranges[1:]):
+        if start < previous_end:
+            raise ValueError(f"{current} overlaps {previous}")
+
+
+def load_subnet_plan(path):
+    """Read and validate a plan written by plan-subnets."""
+    try:
+        with open(path) as plan_file:
+            plan = json.load(plan_file)
+        validate_plan(plan)
+        return plan
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error: Invalid subnet plan {path}: {e}")
+        exit(1)
+
 
 def create_security_group(client, vpc_id, group_name="btu-security-group"):
     """Create a security group with HTTP and SSH access"""
@@ -241,13 +733,12 @@ def create_security_group(client, vpc_id, group_name="btu-security-group"):
             GroupName=group_name,
             Description="Security group for EC2 instance with HTTP and SSH access",
             VpcId=vpc_id,
+            TagSpecifications=name_tag_specification("security-group", group_name),
         )
 
         security_group_id = response["GroupId"]
         print(f"Created security group: {security_group_id}")
 
-        add_name_tag(client, security_group_id, group_name)
-
         client.authorize_security_group_ingress(
             GroupId=security_group_id,
             IpPermissions=[
@@ -297,13 +788,12 @@ def create_rds_security_group(client, vpc_id, group_name="btu-rds-security-group
             GroupName=group_name,
             Description="Security group for RDS MySQL instance with access from anywhere",
             VpcId=vpc_id,
+            TagSpecifications=name_tag_specification("security-group", group_name),
         )
 
         security_group_id = response["GroupId"]
         print(f"Created RDS security group: {security_group_id}")
 
-        add_name_tag(client, security_group_id, group_name)
-
         client.authorize_security_group_ingress(
             GroupId=security_group_id,
             IpPermissions=[
@@ -331,7 +821,10 @@ def create_rds_security_group(client, vpc_id, group_name="btu-rds-security-group
 def create_key_pair(client, key_name="btu-ec2-key"):
     """Create a key pair for EC2 instance"""
     try:
-        response = client.create_key_pair(KeyName=key_name)
+        response = client.create_key_pair(
+            KeyName=key_name,
+            TagSpecifications=name_tag_specification("key-pair", key_name),
+        )
         private_key = response["KeyMaterial"]
         key_file_path = f"{key_name}.pem"
 
@@ -355,25 +848,11 @@ def create_key_pair(client, key_name="btu-ec2-key"):
 
 def get_latest_amazon_linux_ami(client):
     """Get the latest Amazon Linux 2 AMI ID"""
-    try:
-        images = client.describe_images(
-            Owners=["amazon"],
-            Filters=[
-                {"Name": "name", "Values": ["amzn2-ami-hvm-*-x86_64-gp2"]},
-                {"Name": "state", "Values": ["available"]},
-                {"Name": "architecture", "Values": ["x86_64"]},
-            ],
-        )
-
-        if images["Images"]:
-            latest_image = max(images["Images"], key=lambda x: x["CreationDate"])
-            return latest_image["ImageId"]
-        else:
-            print("No Amazon Linux 2 AMI found")
-            return None
-    except Exception as e:
-        print(f"Error finding latest AMI: {e}")
-        return None
+    amis = get_region_metadata(client, "amis")
+    ami_id = amis.get("amazon-linux-2") if amis else None
+    if not ami_id:
+        print("No Amazon Linux 2 AMI found")
+    return ami_id
 
 
 def launch_ec2_instance(
@@ -695,6 +1174,7 @@ def create_rds_snapshot(args):
 def manage_rds_infrastructure(args):
     """Manage RDS infrastructure: create RDS instance with security group"""
     ec2_client = init_client("ec2")
+    args.vpc_id = resolve_vpc_id(ec2_client, args.vpc_id)
 
     print("RDS MySQL Instance Creation Tool")
     print("=" * 50)
@@ -755,6 +1235,7 @@ def manage_rds_infrastructure(args):
 def manage_ec2_infrastructure(args):
     """Manage EC2 infrastructure: create security group, key pair, and launch instance"""
     client = init_client()
+    args.vpc_id = resolve_vpc_id(client, args.vpc_id)
 
     print("EC2 Instance Creation Tool")
     print("=" * 40)
@@ -813,8 +1294,12 @@ def manage_ec2_infrastructure(args):
         print(f"SSH Command: ssh -i {key_file_path} ec2-user@{public_ip}")
 
 
-def manage_vpc_infrastructure(args):
-    """Manage VPC infrastructure: create VPC, subnets, route tables, etc."""
+def build_subnet_plan(args, client=None):
+    """Plan public/private subnet pairs from command line arguments."""
+    if args.num_subnets is None or args.vpc_cidr is None:
+        print("Error: --vpc-cidr and --num-subnets are required without --plan")
+        exit(1)
+
     if args.num_subnets < 1 or args.num_subnets > 200:
         print("Error: Number of subnets must be between 1 and 200")
         exit(1)
@@ -823,75 +1308,164 @@ def manage_vpc_infrastructure(args):
         print("Error: Invalid VPC CIDR")
         exit(1)
 
-    vpc_network = ipaddress.ip_network(args.vpc_cidr)
-    required_prefix_length = (
-        math.ceil(math.log2(args.num_subnets * 2)) + vpc_network.prefixlen
+    if getattr(args, "azs", None):
+        azs = [az.strip() for az in args.azs.split(",") if az.strip()]
+    else:
+        azs = get_available_azs(client or init_client())
+    if len(azs) < 2:
+        print("Error: At least 2 Availability Zones are required for RDS compatibility")
+        exit(1)
+
+    subnets = pair_subnet_requests(
+        args.vpc_name,
+        args.vpc_cidr,
+        args.num_subnets,
+        args.public_prefix,
+        args.private_prefix,
     )
-    if required_prefix_length > 28:
+    try:
+        return plan_subnets(args.vpc_cidr, subnets, azs, args.reserve or [])
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+
+
+def plan_subnet_layout(args):
+    """Write a validated subnet plan as JSON without touching AWS resources."""
+    plan = build_subnet_plan(args)
+
+    if args.output:
+        with open(args.output, "w") as plan_file:
+            json.dump(plan, plan_file, indent=2)
         print(
-            f"Error: VPC CIDR {args.vpc_cidr} is too small for {args.num_subnets} subnet pairs"
+            f"Planned {len(plan['subnets'])} subnets in {plan['vpc_cidr']} "
+            f"({plan['free_addresses']} addresses left), saved to {args.output}"
         )
-        exit(1)
+    else:
+        print(json.dumps(plan, indent=2))
 
-    client = init_client()
 
-    available_azs = get_available_azs(client)
-    if len(available_azs) < 2:
-        print("Error: At least 2 Availability Zones are required for RDS compatibility")
+def route_table_name(vpc_name, subnet, topology):
+    """Name of the route table a planned subnet is associated with."""
+    if topology == "shared":
+        # one public table for the whole VPC, one private table per AZ
+        if subnet["public"]:
+            return f"{vpc_name}-public-rt"
+        return f"{vpc_name}-private-rt-{subnet['az']}"
+    return f"{subnet['name']}-rt"
+
+
+def check_route_table_quota(subnets, topology):
+    """Stop before creating anything that would exceed the route table quota."""
+    if topology == "per-subnet" and len(subnets) + 1 > ROUTE_TABLES_PER_VPC:
+        print(
+            f"Error: {len(subnets)} subnets need {len(subnets)} route tables, "
+            f"over the quota of {ROUTE_TABLES_PER_VPC} per VPC. "
+            "Use --route-tables shared"
+        )
         exit(1)
 
-    vpc_id = create_vpc(client, args.vpc_cidr, args.vpc_name)
-    igw_id = create_and_attach_igw(client, vpc_id, args.vpc_name)
 
-    public_subnet_ids = []
-    private_subnet_ids = []
-    public_rt_ids = []
-    private_rt_ids = []
+def manage_vpc_infrastructure(args):
+    """Manage VPC infrastructure: create VPC, subnets, route tables, etc."""
+    client = init_client()
 
-    for i in range(args.num_subnets):
-        az_index = i % len(available_azs)
-        current_az = available_azs[az_index]
+    if args.plan:
+        layout_flags = {
+            "--vpc-cidr": args.vpc_cidr,
+            "--num-subnets": args.num_subnets,
+            "--public-prefix": args.public_prefix,
+            "--private-prefix": args.private_prefix,
+            "--reserve": args.reserve,
+        }
+        conflicting = [flag for flag, value in layout_flags.items() if value]
+        if conflicting:
+            print(f"Error: {', '.join(conflicting)} cannot be used with --plan")
+            exit(1)
+        plan = load_subnet_plan(args.plan)
+        # a plan saved for another region would fail after the VPC exists
+        available = set(get_available_azs(client))
+        missing = sorted({subnet["az"] for subnet in plan["subnets"]} - available)
+        if missing:
+            print(
+                f"Error: Plan uses AZs not available in "
+                f"{client.meta.region_name}: {', '.join(missing)}"
+            )
+            exit(1)
+    else:
+        plan = build_subnet_plan(args, client)
+    subnets = plan["subnets"]
+    check_route_table_quota(subnets, args.route_tables)
 
-        public_subnet_name = f"{args.vpc_name}-public-subnet-{i+1}"
-        public_subnet_cidr = calculate_subnet_cidr(
-            args.vpc_cidr, i, True, args.num_subnets
-        )
-        public_subnet_id = create_subnet(
-            client, vpc_id, public_subnet_cidr, public_subnet_name, current_az
-        )
-        public_subnet_ids.append(public_subnet_id)
+    vpc_id = create_vpc(client, plan["vpc_cidr"], args.vpc_name)
+    igw_id = create_and_attach_igw(client, vpc_id, args.vpc_name)
 
-        private_subnet_name = f"{args.vpc_name}-private-subnet-{i+1}"
-        private_subnet_cidr = calculate_subnet_cidr(
-            args.vpc_cidr, i, False, args.num_subnets
-        )
-        private_subnet_id = create_subnet(
-            client, vpc_id, private_subnet_cidr, private_subnet_name, current_az
+    # subnets and route tables are created independently, the subnets are
+    # then waited for in one batch before any association is made
+    api_client = RateLimitedClient(client, args.api_rate)
+    tasks = {}
+    route_table_keys = []
+    subnet_keys = [("subnet", i) for i in range(len(subnets))]
+    tasks[("subnets_ready",)] = (
+        subnet_keys,
+        lambda results: wait_until_available(
+            api_client, "subnet", [results[key] for key in subnet_keys]
+        ),
+    )
+    for i, subnet in enumerate(subnets):
+        is_public = subnet["public"]
+        tasks[("subnet", i)] = (
+            [],
+            lambda _, subnet=subnet: create_subnet(
+                api_client, vpc_id, subnet["cidr"], subnet["name"], subnet["az"]
+            ),
         )
-        private_subnet_ids.append(private_subnet_id)
 
-        public_rt_name = f"{args.vpc_name}-public-rt-{i+1}"
-        public_rt_id = create_route_table(
-            client, vpc_id, public_rt_name, is_public=True, igw_id=igw_id
-        )
-        associate_route_table_to_subnet(client, public_rt_id, public_subnet_id)
-        public_rt_ids.append(public_rt_id)
+        rt_name = route_table_name(args.vpc_name, subnet, args.route_tables)
+        rt_key = ("rt", rt_name)
+        route_table_keys.append(rt_key)
+        if rt_key not in tasks:
+            tasks[rt_key] = (
+                [],
+                lambda _, name=rt_name, is_public=is_public: create_route_table(
+                    api_client,
+                    vpc_id,
+                    name,
+                    is_public=is_public,
+                    igw_id=igw_id if is_public else None,
+                ),
+            )
 
-        private_rt_name = f"{args.vpc_name}-private-rt-{i+1}"
-        private_rt_id = create_route_table(
-            client, vpc_id, private_rt_name, is_public=False
+        tasks[("association", i)] = (
+            [("subnets_ready",), rt_key],
+            lambda results, i=i, rt_key=rt_key: associate_route_table_to_subnet(
+                api_client, results[rt_key], results[("subnet", i)]
+            ),
         )
-        associate_route_table_to_subnet(client, private_rt_id, private_subnet_id)
-        private_rt_ids.append(private_rt_id)
+
+    results = run_task_graph(tasks, args.max_workers)
+
+    subnet_ids = [results[("subnet", i)] for i in range(len(subnets))]
+    rt_ids = [results[rt_key] for rt_key in route_table_keys]
+    public_subnet_ids = [
+        subnet_id for subnet_id, subnet in zip(subnet_ids, subnets) if subnet["public"]
+    ]
+    private_subnet_ids = [
+        subnet_id
+        for subnet_id, subnet in zip(subnet_ids, subnets)
+        if not subnet["public"]
+    ]
 
     print("\n--- AWS Infrastructure Setup Complete ---")
-    print(f"VPC ID: {vpc_id} (Name: {args.vpc_name})")
+    print(f"VPC ID: {vpc_id} (Name: {args.vpc_name}, CIDR: {plan['vpc_cidr']})")
     print(f"Internet Gateway ID: {igw_id}")
+    print(f"Route Tables: {len(set(rt_ids))} ({args.route_tables})")
 
-    for i in range(args.num_subnets):
-        print(f"Public Subnet {i+1}: {public_subnet_ids[i]} (RT: {public_rt_ids[i]})")
+    for subnet, subnet_id, rt_id in zip(subnets, subnet_ids, rt_ids):
+        kind = "Public" if subnet["public"] else "Private"
         print(
-            f"Private Subnet {i+1}: {private_subnet_ids[i]} (RT: {private_rt_ids[i]})"
+            f"{kind} Subnet {subnet['name']}: {subnet_id} "
+            f"({subnet['cidr']}, {subnet['az']}, RT: {rt_id})"
         )
 
     print("---------------------------------------")
@@ -904,31 +1478,1276 @@ def manage_vpc_infrastructure(args):
     print("---------------------------------------")
 
 
+def load_spec(path):
+    """Read a desired-state spec from a JSON or YAML file."""
+    try:
+        with open(path) as spec_file:
+            if path.endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    print("Error: YAML specs require the PyYAML package")
+                    exit(1)
+                try:
+                    spec = yaml.safe_load(spec_file)
+                except yaml.YAMLError as e:
+                    raise ValueError(e)
+            else:
+                spec = json.load(spec_file)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not read spec {path}: {e}")
+        exit(1)
+
+    # an empty YAML file loads as None
+    if not isinstance(spec, dict):
+        print(f"Error: Spec {path} must be a mapping with vpc_name and vpc_cidr")
+        exit(1)
+    if spec.get("route_tables", "per-subnet") not in ROUTE_TABLE_TOPOLOGIES:
+        print(
+            f"Error: Spec {path} has route_tables {spec['route_tables']!r}, "
+            f"expected one of: {', '.join(ROUTE_TABLE_TOPOLOGIES)}"
+        )
+        exit(1)
+    return spec
+
+
+def plan_from_spec(spec, client):
+    """Turn a spec into a validated subnet plan.
+
+    A spec either lists its subnets like a plan-subnets file, or gives
+    num_subnets (plus optional prefixes, reserve and azs) to plan pairs.
+    """
+    if "vpc_name" not in spec or "vpc_cidr" not in spec:
+        print("Error: The spec needs vpc_name and vpc_cidr")
+        exit(1)
+
+    if "subnets" in spec:
+        try:
+            validate_plan(spec)
+        except (KeyError, ValueError) as e:
+            print(f"Error: Invalid subnets in spec: {e}")
+            exit(1)
+        return spec
+
+    azs = spec.get("azs")
+    args = argparse.Namespace(
+        vpc_name=spec["vpc_name"],
+        vpc_cidr=spec["vpc_cidr"],
+        num_subnets=spec.get("num_subnets"),
+        public_prefix=spec.get("public_prefix"),
+        private_prefix=spec.get("private_prefix"),
+        reserve=spec.get("reserve"),
+        azs=",".join(azs) if azs else None,
+    )
+    return build_subnet_plan(args, client)
+
+
+def describe_all(client, operation, result_key, **kwargs):
+    """Collect every item of a paginated describe_* call."""
+    items = []
+    for page in client.get_paginator(operation).paginate(**kwargs):
+        items.extend(page[result_key])
+    return items
+
+
+def get_name_tag(resource):
+    """Returns the 'Name' tag of a described resource, if any."""
+    for tag in resource.get("Tags", []):
+        if tag["Key"] == "Name":
+            return tag["Value"]
+    return None
+
+
+def discover_vpc_state(client, vpc_name):
+    """Find the VPC named vpc_name and what it contains in five describe calls."""
+    vpcs = describe_all(
+        client,
+        "describe_vpcs",
+        "Vpcs",
+        Filters=[{"Name": "tag:Name", "Values": [vpc_name]}],
+    )
+    if len(vpcs) > 1:
+        print(f"Error: {len(vpcs)} VPCs are named {vpc_name}, expected at most one")
+        exit(1)
+
+    state = {
+        "vpc": None,
+        "igw": None,
+        "detached_igw": None,
+        "subnets": {},
+        "route_tables": {},
+    }
+
+    # a failed apply can leave its gateway created but never attached
+    for igw in describe_all(
+        client,
+        "describe_internet_gateways",
+        "InternetGateways",
+        Filters=[{"Name": "tag:Name", "Values": [f"{vpc_name}-IGW"]}],
+    ):
+        if not igw.get("Attachments"):
+            state["detached_igw"] = igw["InternetGatewayId"]
+            break
+
+    if not vpcs:
+        return state
+
+    vpc_id = vpcs[0]["VpcId"]
+    state["vpc"] = {"id": vpc_id, "cidr": vpcs[0]["CidrBlock"]}
+
+    calls = {
+        "igws": ("describe_internet_gateways", "InternetGateways", "attachment.vpc-id"),
+        "subnets": ("describe_subnets", "Subnets", "vpc-id"),
+        "route_tables": ("describe_route_tables", "RouteTables", "vpc-id"),
+    }
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = {
+            name: executor.submit(
+                describe_all,
+                client,
+                operation,
+                result_key,
+                Filters=[{"Name": filter_name, "Values": [vpc_id]}],
+            )
+            for name, (operation, result_key, filter_name) in calls.items()
+        }
+    found = {name: future.result() for name, future in futures.items()}
+
+    if found["igws"]:
+        state["igw"] = found["igws"][0]["InternetGatewayId"]
+
+    for subnet in found["subnets"]:
+        name = get_name_tag(subnet)
+        if name:
+            state["subnets"][name] = {
+                "id": subnet["SubnetId"],
+                "cidr": subnet["CidrBlock"],
+                "az": subnet["AvailabilityZone"],
+                "association": None,
+            }
+
+    subnet_names = {subnet["id"]: name for name, subnet in state["subnets"].items()}
+    for route_table in found["route_tables"]:
+        default_routes = [
+            route.get("GatewayId")
+            for route in route_table.get("Routes", [])
+            if route.get("DestinationCidrBlock") == "0.0.0.0/0"
+        ]
+        name = get_name_tag(route_table)
+        if name:
+            state["route_tables"][name] = {
+                "id": route_table["RouteTableId"],
+                "default_route": default_routes[0] if default_routes else None,
+            }
+        for association in route_table.get("Associations", []):
+            subnet_name = subnet_names.get(association.get("SubnetId"))
+            if subnet_name:
+                state["subnets"][subnet_name]["association"] = {
+                    "id": association["RouteTableAssociationId"],
+                    "route_table_id": route_table["RouteTableId"],
+                }
+
+    return state
+
+
+def diff_vpc_state(plan, state, vpc_name, topology):
+    """Compare the planned VPC with what exists.
+
+    Returns (changes, conflicts, existing). Each change has a task key, the
+    keys it depends on, a summary and run(client, ids), where ids maps task
+    keys to existing or newly created resource IDs; existing holds the IDs
+    already in AWS. Conflicts are resources that differ from the plan and
+    would have to be replaced by hand.
+    """
+    changes = {}
+    conflicts = []
+    existing = {}
+
+    def change(key, depends_on, summary, run):
+        # shared route tables are reached from several subnets
+        if key not in changes:
+            changes[key] = {
+                "key": key,
+                "depends_on": depends_on,
+                "summary": summary,
+                "run": run,
+            }
+
+    vpc = state["vpc"]
+    if vpc:
+        existing[("vpc",)] = vpc["id"]
+        if vpc["cidr"] != plan["vpc_cidr"]:
+            conflicts.append(
+                f"VPC {vpc_name} ({vpc['id']}) has CIDR {vpc['cidr']}, "
+                f"the spec wants {plan['vpc_cidr']}"
+            )
+    else:
+        change(
+            ("vpc",),
+            [],
+            f"create VPC {vpc_name} ({plan['vpc_cidr']})",
+            lambda client, ids: create_vpc(client, plan["vpc_cidr"], vpc_name),
+        )
+
+    if state["igw"]:
+        existing[("igw",)] = state["igw"]
+    elif state["detached_igw"]:
+        igw_id = state["detached_igw"]
+
+        def attach_igw(client, ids):
+            client.attach_internet_gateway(
+                InternetGatewayId=igw_id, VpcId=ids[("vpc",)]
+            )
+            print(f"Attached Internet Gateway {igw_id} to VPC {ids[('vpc',)]}")
+            return igw_id
+
+        change(
+            ("igw",),
+            [("vpc",)],
+            f"attach existing Internet Gateway {vpc_name}-IGW ({igw_id})",
+            attach_igw,
+        )
+    else:
+        change(
+            ("igw",),
+            [("vpc",)],
+            f"create and attach Internet Gateway {vpc_name}-IGW",
+            lambda client, ids: create_and_attach_igw(client, ids[("vpc",)], vpc_name),
+        )
+
+    for subnet in plan["subnets"]:
+        rt_name = route_table_name(vpc_name, subnet, topology)
+        rt_key = ("rt", rt_name)
+        rt = state["route_tables"].get(rt_name)
+        if rt:
+            existing[rt_key] = rt["id"]
+            if subnet["public"] and rt["default_route"] is None:
+                change(
+                    ("route", rt_name),
+                    [("igw",)],
+                    f"add default route to the IGW in {rt_name}",
+                    lambda client, ids, rt_key=rt_key: client.create_route(
+                        RouteTableId=ids[rt_key],
+                        DestinationCidrBlock="0.0.0.0/0",
+                        GatewayId=ids[("igw",)],
+                    ),
+                )
+        else:
+            change(
+                rt_key,
+                [("vpc",), ("igw",)] if subnet["public"] else [("vpc",)],
+                f"create {'public' if subnet['public'] else 'private'} "
+                f"route table {rt_name}",
+                lambda client, ids, name=rt_name, is_public=subnet["public"]: (
+                    create_route_table(
+                        client,
+                        ids[("vpc",)],
+                        name,
+                        is_public=is_public,
+                        igw_id=ids[("igw",)] if is_public else None,
+                    )
+                ),
+            )
+
+        subnet_key = ("subnet", subnet["name"])
+        current = state["subnets"].get(subnet["name"])
+        if current:
+            existing[subnet_key] = current["id"]
+            if (current["cidr"], current["az"]) != (subnet["cidr"], subnet["az"]):
+                conflicts.append(
+                    f"Subnet {subnet['name']} ({current['id']}) is "
+                    f"{current['cidr']} in {current['az']}, the spec wants "
+                    f"{subnet['cidr']} in {subnet['az']}"
+                )
+                continue
+        else:
+            change(
+                subnet_key,
+                [("vpc",)],
+                f"create subnet {subnet['name']} {subnet['cidr']} ({subnet['az']})",
+                lambda client, ids, subnet=subnet: create_subnet(
+                    client,
+                    ids[("vpc",)],
+                    subnet["cidr"],
+                    subnet["name"],
+                    subnet["az"],
+                ),
+            )
+
+        association = current["association"] if current else None
+        if association is None:
+            change(
+                ("association", subnet["name"]),
+                [subnet_key, rt_key],
+                f"associate {subnet['name']} with {rt_name}",
+                lambda client, ids, subnet_key=subnet_key, rt_key=rt_key: (
+                    associate_route_table_to_subnet(
+                        client, ids[rt_key], ids[subnet_key]
+                    )
+                ),
+            )
+        elif association["route_table_id"] != existing.get(rt_key):
+            change(
+                ("association", subnet["name"]),
+                [rt_key],
+                f"move {subnet['name']} to route table {rt_name}",
+                lambda client, ids, association=association, rt_key=rt_key: (
+                    client.replace_route_table_association(
+                        AssociationId=association["id"], RouteTableId=ids[rt_key]
+                    )
+                ),
+            )
+
+    return list(changes.values()), conflicts, existing
+
+
+def print_vpc_changes(spec_path, changes, conflicts):
+    """Print the changes and conflicts found by diff_vpc_state."""
+    if not changes and not conflicts:
+        print(f"No changes: the VPC matches {spec_path}")
+        return
+
+    for pending in changes:
+        print(f"  + {pending['summary']}")
+    for conflict in conflicts:
+        print(f"  ! {conflict}")
+    print(f"{len(changes)} change(s), {len(conflicts)} conflict(s)")
+
+
+def manage_vpc_state(args):
+    """Show (plan) or make (apply) the changes that bring a VPC to its spec."""
+    client = init_client()
+    spec = load_spec(args.spec)
+    plan = plan_from_spec(spec, client)
+    vpc_name = spec["vpc_name"]
+    topology = spec.get("route_tables", "per-subnet")
+    check_route_table_quota(plan["subnets"], topology)
+
+    state = discover_vpc_state(client, vpc_name)
+    changes, conflicts, existing = diff_vpc_state(plan, state, vpc_name, topology)
+    print_vpc_changes(args.spec, changes, conflicts)
+
+    if args.command == "plan":
+        return
+    if conflicts:
+        print("Error: Resolve the conflicts above before applying")
+        exit(1)
+    if not changes:
+        return
+
+    api_client = RateLimitedClient(client, args.api_rate)
+    pending_keys = {pending["key"] for pending in changes}
+    tasks = {
+        pending["key"]: (
+            [key for key in pending["depends_on"] if key in pending_keys],
+            lambda results, run=pending["run"]: run(
+                api_client, ChainMap(results, existing)
+            ),
+        )
+        for pending in changes
+    }
+
+    # new subnets are waited for together, associations wait for the batch
+    new_subnet_keys = [key for key in tasks if key[0] == "subnet"]
+    if new_subnet_keys:
+        for key, (dependencies, _) in tasks.items():
+            if any(dependency in new_subnet_keys for dependency in dependencies):
+                dependencies.append(("subnets_ready",))
+        tasks[("subnets_ready",)] = (
+            new_subnet_keys,
+            lambda results: wait_until_available(
+                api_client, "subnet", [results[key] for key in new_subnet_keys]
+            ),
+        )
+    results = run_task_graph(tasks, args.max_workers)
+
+    vpc_id = results.get(("vpc",)) or existing[("vpc",)]
+    print(f"\nApplied {len(changes)} change(s) to VPC {vpc_id} ({vpc_name})")
+
+
+def resource_vpc_id(kind, resource):
+    """The VPC a described resource belongs to, if any."""
+    if kind == "internet_gateways":
+        attachments = resource.get("Attachments", [])
+        return attachments[0]["VpcId"] if attachments else None
+    return resource.get("VpcId")
+
+
+def describe_inventory_kind(client, kind):
+    """Fetch every resource of one inventory kind, following pagination."""
+    operation, result_key, _ = INVENTORY_KINDS[kind]
+    items = describe_all(client, operation, result_key)
+    if kind == "instances":
+        # instances come grouped by the reservation that launched them
+        items = [
+            instance for reservation in items for instance in reservation["Instances"]
+        ]
+    return items
+
+
+def open_inventory(migrate=True):
+    """Opens the inventory cache, creating its tables on first use.
+
+    Without migrate the tables are taken as they are: threads opening the
+    cache together do so after one migrating open.
+    """
+    connection = sqlite3.connect(INVENTORY_PATH)
+    if not migrate:
+        return connection
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version != INVENTORY_SCHEMA:
+        # only a cache: drop what an older version wrote and fetch again
+        connection.executescript(f"""
+            DROP TABLE IF EXISTS resources;
+            DROP TABLE IF EXISTS snapshots;
+            PRAGMA user_version = {INVENTORY_SCHEMA};
+            """)
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS resources (
+            account TEXT, region TEXT, kind TEXT, id TEXT, vpc_id TEXT,
+            name TEXT, data TEXT,
+            PRIMARY KEY (account, region, kind, id)
+        );
+        CREATE INDEX IF NOT EXISTS resources_by_vpc
+            ON resources (account, region, vpc_id, kind);
+        CREATE TABLE IF NOT EXISTS snapshots (
+            account TEXT, region TEXT, kind TEXT, fetched_at REAL,
+            PRIMARY KEY (account, region, kind)
+        );
+        """)
+    return connection
+
+
+def refresh_inventory(connection, client, account, region, max_workers=6):
+    """Describe every inventory kind concurrently and replace the cached rows."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            kind: executor.submit(describe_inventory_kind, client, kind)
+            for kind in INVENTORY_KINDS
+        }
+    fetched = {kind: future.result() for kind, future in futures.items()}
+
+    fetched_at = time.time()
+    with connection:
+        for kind, items in fetched.items():
+            id_key = INVENTORY_KINDS[kind][2]
+            connection.execute(
+                "DELETE FROM resources WHERE account = ? AND region = ? AND kind = ?",
+                (account, region, kind),
+            )
+            connection.executemany(
+                "INSERT INTO resources VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        account,
+                        region,
+                        kind,
+                        item[id_key],
+                        resource_vpc_id(kind, item),
+                        get_name_tag(item),
+                        # LaunchTime and friends are datetimes
+                        json.dumps(item, default=str),
+                    )
+                    for item in items
+                ],
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                (account, region, kind, fetched_at),
+            )
+    return sum(len(items) for items in fetched.values())
+
+
+def inventory_age(connection, account, region):
+    """Seconds since the oldest cached kind was fetched, None if incomplete."""
+    rows = connection.execute(
+        "SELECT kind, fetched_at FROM snapshots WHERE account = ? AND region = ?",
+        (account, region),
+    ).fetchall()
+    if {kind for kind, _ in rows} != set(INVENTORY_KINDS):
+        return None
+    return time.time() - min(fetched_at for _, fetched_at in rows)
+
+
+def load_inventory(client, account, ttl=INVENTORY_TTL, refresh=False, migrate=True):
+    """Returns (connection, region), refreshing the cache if it is stale."""
+    region = client.meta.region_name
+    connection = open_inventory(migrate)
+    age = inventory_age(connection, account, region)
+    if refresh or age is None or age > ttl:
+        count = refresh_inventory(connection, client, account, region)
+        print(
+            f"Fetched {count} resources of {account} in {region} "
+            f"into {INVENTORY_PATH}"
+        )
+    else:
+        print(
+            f"Using inventory of {account} in {region} "
+            f"cached {age / 60:.0f} min ago"
+        )
+    return connection, region
+
+
+def query_inventory(connection, account, region, kind=None, vpc_id=None):
+    """Cached resources filtered by kind and VPC.
+
+    Each entry has kind, id, vpc_id, name and data, the resource as AWS
+    described it.
+    """
+    query = (
+        "SELECT kind, id, vpc_id, name, data FROM resources "
+        "WHERE account = ? AND region = ?"
+    )
+    params = [account, region]
+    if kind:
+        query += " AND kind = ?"
+        params.append(kind)
+    if vpc_id:
+        query += " AND vpc_id = ?"
+        params.append(vpc_id)
+    return [
+        {
+            "kind": kind,
+            "id": resource_id,
+            "vpc_id": vpc_id,
+            "name": name,
+            "data": json.loads(data),
+        }
+        for kind, resource_id, vpc_id, name, data in connection.execute(
+            query + " ORDER BY kind, name", params
+        )
+    ]
+
+
+def inventory_counts(connection, account, region):
+    """Cached resources per VPC and kind: {vpc_id: {kind: count}}."""
+    counts = {}
+    for vpc_id, kind, count in connection.execute(
+        "SELECT vpc_id, kind, COUNT(*) FROM resources "
+        "WHERE account = ? AND region = ? GROUP BY vpc_id, kind",
+        (account, region),
+    ):
+        counts.setdefault(vpc_id, {})[kind] = count
+    return counts
+
+
+def load_inventories(regions, account, ttl=INVENTORY_TTL, refresh=False):
+    """Bring the cache of every region up to date, regions in parallel.
+
+    Each region gets its own client and cache connection, as neither can
+    be shared between threads. The tables are migrated once, here, before
+    any thread connects. Returns a connection for reading.
+    """
+    clients = {region: init_client("ec2", region) for region in regions}
+    connection = open_inventory()
+
+    def load(region):
+        region_connection, _ = load_inventory(
+            clients[region], account, ttl, refresh, migrate=False
+        )
+        region_connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(regions)) as executor:
+        for future in [executor.submit(load, region) for region in regions]:
+            future.result()
+    return connection
+
+
+def show_inventory(args):
+    """Report VPC resources from the local inventory cache.
+
+    Only this report reads the cache; commands that change resources always
+    describe them live.
+    """
+    account = get_account_id()
+    if args.regions:
+        regions = args.regions
+        connection = load_inventories(regions, account, args.ttl, args.refresh)
+    else:
+        connection, region = load_inventory(
+            init_client(), account, args.ttl, args.refresh
+        )
+        regions = [region]
+    many = len(regions) > 1
+
+    if args.kind or args.vpc_id:
+        resources = {
+            region: query_inventory(connection, account, region, args.kind, args.vpc_id)
+            for region in regions
+        }
+        if args.json:
+            data = {
+                region: [resource["data"] for resource in found]
+                for region, found in resources.items()
+            }
+            print(json.dumps(data if many else data[regions[0]], indent=2))
+            return
+        for region, found in resources.items():
+            for resource in found:
+                print(
+                    (f"{region:<16} " if many else "")
+                    + f"{resource['kind']:<18} {resource['id']:<24} "
+                    f"{resource['vpc_id'] or '-':<22} {resource['name'] or ''}"
+                )
+        return
+
+    counts = {
+        region: inventory_counts(connection, account, region) for region in regions
+    }
+    if args.json:
+        print(json.dumps(counts if many else counts[regions[0]], indent=2))
+        return
+
+    for region in regions:
+        print(f"\n--- Inventory for {region} ---")
+        region_counts = counts[region]
+        for vpc in query_inventory(connection, account, region, "vpcs"):
+            vpc_counts = region_counts.get(vpc["id"], {})
+            summary = ", ".join(
+                f"{vpc_counts.get(kind, 0)} {kind.replace('_', ' ')}"
+                for kind in INVENTORY_KINDS
+                if kind != "vpcs"
+            )
+            print(
+                f"VPC {vpc['id']} ({vpc['name'] or 'unnamed'}, "
+                f"{vpc['data']['CidrBlock']}): {summary}"
+            )
+        unattached = region_counts.get(None, {})
+        if unattached:
+            print(
+                "Outside any VPC: "
+                + ", ".join(f"{count} {kind}" for kind, count in unattached.items())
+            )
+    print("---------------------------------------")
+
+    if many:
+        totals = {}
+        for region_counts in counts.values():
+            for vpc_counts in region_counts.values():
+                for kind, count in vpc_counts.items():
+                    totals[kind] = totals.get(kind, 0) + count
+        print(
+            f"All {len(regions)} regions: "
+            + ", ".join(
+                f"{totals.get(kind, 0)} {kind.replace('_', ' ')}"
+                for kind in INVENTORY_KINDS
+            )
+        )
+
+
+def find_vpc(client, vpc):
+    """Looks up a VPC by ID or Name tag, exits unless exactly one matches."""
+    if vpc.startswith("vpc-"):
+        vpcs = describe_all(client, "describe_vpcs", "Vpcs", VpcIds=[vpc])
+    else:
+        vpcs = describe_all(
+            client,
+            "describe_vpcs",
+            "Vpcs",
+            Filters=[{"Name": "tag:Name", "Values": [vpc]}],
+        )
+    if len(vpcs) != 1:
+        print(f"Error: Expected one VPC matching {vpc}, found {len(vpcs)}")
+        exit(1)
+    return vpcs[0]
+
+
+def discover_vpc_dependencies(client, rds_client, vpc_id):
+    """Everything in a VPC that has to be deleted before the VPC itself."""
+    vpc_filter = [{"Name": "vpc-id", "Values": [vpc_id]}]
+    live_states = ["pending", "running", "stopping", "stopped", "shutting-down"]
+    calls = {
+        "instances": lambda: describe_all(
+            client,
+            "describe_instances",
+            "Reservations",
+            Filters=vpc_filter
+            + [{"Name": "instance-state-name", "Values": live_states}],
+        ),
+        "security_groups": lambda: describe_all(
+            client, "describe_security_groups", "SecurityGroups", Filters=vpc_filter
+        ),
+        "route_tables": lambda: describe_all(
+            client, "describe_route_tables", "RouteTables", Filters=vpc_filter
+        ),
+        "subnets": lambda: describe_all(
+            client, "describe_subnets", "Subnets", Filters=vpc_filter
+        ),
+        "internet_gateways": lambda: describe_all(
+            client,
+            "describe_internet_gateways",
+            "InternetGateways",
+            Filters=[{"Name": "attachment.vpc-id", "Values": [vpc_id]}],
+        ),
+        # RDS has no VPC filter, so these are matched client-side
+        "db_instances": lambda: [
+            db
+            for db in describe_all(rds_client, "describe_db_instances", "DBInstances")
+            if db.get("DBSubnetGroup", {}).get("VpcId") == vpc_id
+        ],
+        "db_subnet_groups": lambda: [
+            group
+            for group in describe_all(
+                rds_client, "describe_db_subnet_groups", "DBSubnetGroups"
+            )
+            if group["VpcId"] == vpc_id
+        ],
+    }
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = {name: executor.submit(call) for name, call in calls.items()}
+    found = {name: future.result() for name, future in futures.items()}
+
+    found["instances"] = [
+        instance
+        for reservation in found["instances"]
+        for instance in reservation["Instances"]
+    ]
+    return found
+
+
+def retry_dependency_violation(call, attempts=8, **kwargs):
+    """Run a delete call, retrying while AWS still reports a dependency.
+
+    Network interfaces of terminated instances and deleted databases are
+    released asynchronously, so deletes right after them can briefly fail.
+    """
+    for attempt in range(attempts):
+        try:
+            return call(**kwargs)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "DependencyViolation":
+                raise
+            if attempt == attempts - 1:
+                raise
+            time.sleep(min(2**attempt, 30))
+
+
+def plan_vpc_teardown(client, rds_client, vpc_id, found):
+    """Delete steps for a VPC and its dependents, in dependency order.
+
+    Each step has a key, the keys it has to wait for, a summary and run().
+    Waiters are only used where a later step needs the resource fully gone:
+    terminated instances and deleted databases.
+    """
+    steps = []
+
+    def step(key, depends_on, summary, run):
+        steps.append(
+            {"key": key, "depends_on": depends_on, "summary": summary, "run": run}
+        )
+
+    def terminate_instances(instance_ids):
+        client.terminate_instances(InstanceIds=instance_ids)
+        client.get_waiter("instance_terminated").wait(InstanceIds=instance_ids)
+        print(f"Terminated {len(instance_ids)} instance(s)")
+
+    def delete_db_instance(db_instance_identifier):
+        rds_client.delete_db_instance(
+            DBInstanceIdentifier=db_instance_identifier,
+            SkipFinalSnapshot=True,
+            DeleteAutomatedBackups=True,
+        )
+        rds_client.get_waiter("db_instance_deleted").wait(
+            DBInstanceIdentifier=db_instance_identifier,
+            WaiterConfig={"Delay": 30, "MaxAttempts": 60},
+        )
+        print(f"Deleted RDS instance {db_instance_identifier}")
+
+    def detach_and_delete_igw(igw_id):
+        client.detach_internet_gateway(InternetGatewayId=igw_id, VpcId=vpc_id)
+        client.delete_internet_gateway(InternetGatewayId=igw_id)
+        print(f"Deleted Internet Gateway {igw_id}")
+
+    def revoke_group_references(group):
+        for direction, revoke in (
+            ("IpPermissions", client.revoke_security_group_ingress),
+            ("IpPermissionsEgress", client.revoke_security_group_egress),
+        ):
+            permissions = [
+                permission
+                for permission in group[direction]
+                if permission.get("UserIdGroupPairs")
+            ]
+            if permissions:
+                revoke(GroupId=group["GroupId"], IpPermissions=permissions)
+
+    instance_ids = [instance["InstanceId"] for instance in found["instances"]]
+    if instance_ids:
+        step(
+            ("instances",),
+            [],
+            f"terminate {len(instance_ids)} EC2 instance(s): {', '.join(instance_ids)}",
+            lambda: terminate_instances(instance_ids),
+        )
+
+    db_keys = []
+    for db in found["db_instances"]:
+        identifier = db["DBInstanceIdentifier"]
+        db_keys.append(("db", identifier))
+        step(
+            ("db", identifier),
+            [],
+            f"delete RDS instance {identifier} (no final snapshot)",
+            lambda identifier=identifier: delete_db_instance(identifier),
+        )
+
+    # running instances and databases hold ENIs in subnets and SGs, and
+    # their public IPs keep the IGW from detaching
+    compute_keys = [("instances",)] + db_keys
+
+    group_keys = []
+    for group in found["db_subnet_groups"]:
+        name = group["DBSubnetGroupName"]
+        group_keys.append(("db_subnet_group", name))
+        step(
+            ("db_subnet_group", name),
+            db_keys,
+            f"delete DB subnet group {name}",
+            lambda name=name: rds_client.delete_db_subnet_group(DBSubnetGroupName=name),
+        )
+
+    # security groups that reference each other cannot be deleted until
+    # those rules are gone
+    custom_groups = [
+        group for group in found["security_groups"] if group["GroupName"] != "default"
+    ]
+    rule_keys = []
+    for group in custom_groups:
+        if any(
+            permission.get("UserIdGroupPairs")
+            for permission in group["IpPermissions"] + group["IpPermissionsEgress"]
+        ):
+            rule_keys.append(("sg_rules", group["GroupId"]))
+            step(
+                ("sg_rules", group["GroupId"]),
+                [],
+                f"revoke rules of {group['GroupId']} that reference other groups",
+                lambda group=group: revoke_group_references(group),
+            )
+    for group in custom_groups:
+        step(
+            ("sg", group["GroupId"]),
+            compute_keys + rule_keys,
+            f"delete security group {group['GroupId']} ({group['GroupName']})",
+            lambda group_id=group["GroupId"]: retry_dependency_violation(
+                client.delete_security_group, GroupId=group_id
+            ),
+        )
+
+    subnet_association_keys = {}
+    for route_table in found["route_tables"]:
+        associations = route_table.get("Associations", [])
+        # the main route table goes away with the VPC
+        is_main = any(association.get("Main") for association in associations)
+        association_keys = []
+        for association in associations:
+            if association.get("Main"):
+                continue
+            key = ("association", association["RouteTableAssociationId"])
+            association_keys.append(key)
+            subnet_association_keys.setdefault(association.get("SubnetId"), []).append(
+                key
+            )
+            step(
+                key,
+                [],
+                f"disassociate {route_table['RouteTableId']} from "
+                f"{association.get('SubnetId')}",
+                lambda association_id=key[1]: client.disassociate_route_table(
+                    AssociationId=association_id
+                ),
+            )
+        if not is_main:
+            step(
+                ("route_table", route_table["RouteTableId"]),
+                association_keys,
+                f"delete route table {route_table['RouteTableId']} "
+                f"({get_name_tag(route_table) or 'unnamed'})",
+                lambda rt_id=route_table["RouteTableId"]: client.delete_route_table(
+                    RouteTableId=rt_id
+                ),
+            )
+
+    for igw in found["internet_gateways"]:
+        step(
+            ("igw", igw["InternetGatewayId"]),
+            compute_keys,
+            f"detach and delete Internet Gateway {igw['InternetGatewayId']}",
+            lambda igw_id=igw["InternetGatewayId"]: detach_and_delete_igw(igw_id),
+        )
+
+    for subnet in found["subnets"]:
+        subnet_id = subnet["SubnetId"]
+        step(
+            ("subnet", subnet_id),
+            compute_keys + group_keys + subnet_association_keys.get(subnet_id, []),
+            f"delete subnet {subnet_id} ({get_name_tag(subnet) or 'unnamed'}, "
+            f"{subnet['CidrBlock']})",
+            lambda subnet_id=subnet_id: retry_dependency_violation(
+                client.delete_subnet, SubnetId=subnet_id
+            ),
+        )
+
+    step(
+        ("vpc",),
+        [other["key"] for other in steps],
+        f"delete VPC {vpc_id}",
+        lambda: retry_dependency_violation(client.delete_vpc, VpcId=vpc_id),
+    )
+    return steps
+
+
+def destroy_vpc(args):
+    """Delete a VPC and everything in it, independent deletes in parallel."""
+    client = init_client()
+    rds_client = init_client("rds")
+
+    vpc = find_vpc(client, args.vpc)
+    vpc_id = vpc["VpcId"]
+    found = discover_vpc_dependencies(client, rds_client, vpc_id)
+
+    api_client = RateLimitedClient(client, args.api_rate)
+    steps = plan_vpc_teardown(api_client, rds_client, vpc_id, found)
+
+    print(f"Destroying VPC {vpc_id} ({get_name_tag(vpc) or 'unnamed'}):")
+    for pending in steps:
+        print(f"  - {pending['summary']}")
+
+    if not args.yes:
+        print("Nothing deleted. Run again with --yes to delete these resources")
+        return
+
+    step_keys = {pending["key"] for pending in steps}
+    tasks = {
+        pending["key"]: (
+            [key for key in pending["depends_on"] if key in step_keys],
+            lambda _, run=pending["run"]: run(),
+        )
+        for pending in steps
+    }
+    started = time.monotonic()
+    try:
+        run_task_graph(tasks, args.max_workers)
+    except Exception as e:
+        print(f"Error: Teardown of {vpc_id} stopped: {e}")
+        exit(1)
+
+    print(
+        f"\nDeleted VPC {vpc_id} and {len(steps) - 1} dependent step(s) "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+
+
+def show_regions(args):
+    """Warm the region metadata cache and print what it holds."""
+    regions = args.regions or [init_client().meta.region_name]
+    # clients are created up front, boto3 is not thread-safe while creating them
+    clients = {region: init_client("ec2", region) for region in regions}
+    metadata = warm_region_metadata(clients, REGION_FIELDS, args.ttl, args.refresh)
+
+    complete = True
+    for region in regions:
+        info = metadata[region]
+        if len(info) < len(REGION_FIELDS):
+            complete = False
+        if not info:
+            print(f"{region}: no metadata")
+            continue
+        age = int(time.time() - min(entry["fetched_at"] for entry in info.values()))
+        print(f"{region} (cached {age}s ago)")
+        if "azs" in info:
+            zones = info["azs"]["value"]
+            print("  AZs: " + ", ".join(f"{az} ({zones[az]})" for az in zones))
+        if "default_vpc" in info:
+            print(f"  Default VPC: {info['default_vpc']['value'] or 'none'}")
+        for family, ami_id in info.get("amis", {}).get("value", {}).items():
+            print(f"  {family}: {ami_id or 'not found'}")
+
+    if not complete:
+        exit(1)
+
+
+def parse_regions(value):
+    """Split a comma-separated --regions value."""
+    return [region.strip() for region in value.split(",") if region.strip()]
+
+
+def fan_out_regions(regions, argv):
+    """Run this command once per region, each in its own process.
+
+    Every child gets its own clients and its own exit code, so a failure
+    in one region does not stop the others. Output is collected and printed
+    region by region, followed by a summary. Returns 1 if any region failed.
+    """
+    child_argv = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == "--regions":
+            skip = True
+        elif not arg.startswith("--regions="):
+            child_argv.append(arg)
+
+    # one concurrent lookup for all regions instead of one per child; the
+    # VPC commands only need the AZs
+    warm_region_metadata(
+        {region: init_client("ec2", region) for region in regions}, ("azs",)
+    )
+
+    def run(region):
+        started = time.monotonic()
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *child_argv],
+            env={**os.environ, "aws_region_name": region, FAN_OUT_CHILD_ENV: "1"},
+            capture_output=True,
+            text=True,
+        )
+        return completed, time.monotonic() - started
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(regions)) as executor:
+        futures = {executor.submit(run, region): region for region in regions}
+        for future in as_completed(futures):
+            region = futures[future]
+            results[region] = future.result()
+            completed, elapsed = results[region]
+            print(f"{region} finished in {elapsed:.1f}s (exit {completed.returncode})")
+
+    for region in regions:
+        completed, _ = results[region]
+        print(f"\n===== {region} =====")
+        print((completed.stdout + completed.stderr).rstrip())
+
+    print("\n--- Regions ---")
+    for region in regions:
+        completed, elapsed = results[region]
+        status = "ok" if completed.returncode == 0 else "failed"
+        print(f"{region:<16} {status:<8} {elapsed:7.1f}s")
+    return int(any(completed.returncode for completed, _ in results.values()))
+
+
+def tag_existing_resources(args):
+    """Retrofit tags onto existing resources with bulk create_tags calls."""
+    tags = {}
+    for tag in args.tag:
+        key, separator, value = tag.partition("=")
+        if not separator or not key:
+            print(f"Error: Invalid tag '{tag}', expected KEY=VALUE")
+            exit(1)
+        tags[key] = value
+
+    client = init_client()
+    if not tag_resources(client, args.resource_ids, tags):
+        exit(1)
+
+
+def add_subnet_layout_arguments(subparser):
+    """Arguments shared by create-vpc and plan-subnets."""
+    subparser.add_argument(
+        "--vpc-name",
+        required=True,
+        help="Name tag for the VPC (e.g., my-vpc)",
+    )
+    subparser.add_argument(
+        "--vpc-cidr",
+        help="CIDR block for the VPC (e.g., 10.0.0.0/16)",
+    )
+    subparser.add_argument(
+        "--num-subnets",
+        type=int,
+        help="Number of public/private subnet pairs to create (max 200)",
+    )
+    subparser.add_argument(
+        "--public-prefix",
+        type=int,
+        help="Prefix length of public subnets (default: smallest that fits)",
+    )
+    subparser.add_argument(
+        "--private-prefix",
+        type=int,
+        help="Prefix length of private subnets (default: smallest that fits)",
+    )
+    subparser.add_argument(
+        "--reserve",
+        action="append",
+        metavar="CIDR",
+        help="Range to leave unallocated, can be repeated",
+    )
+
+
+def add_regions_argument(subparser):
+    """--regions for the subcommands that can run in several regions.
+
+    Their parsers are built with allow_abbrev=False: fan_out_regions strips
+    --regions from the child's arguments and must see it spelled out.
+    """
+    subparser.add_argument(
+        "--regions",
+        type=parse_regions,
+        help="Comma-separated regions to run in concurrently, each with its "
+        "own clients (default: aws_region_name)",
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(
-        description="AWS VPC, EC2, RDS, and DynamoDB Management CLI Tool"
+        description="AWS VPC, EC2, RDS, and DynamoDB Management CLI Tool",
+        allow_abbrev=False,
     )
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     vpc_parser = subparsers.add_parser(
         "create-vpc",
         help="Create VPC with subnets and networking",
+        allow_abbrev=False,
     )
+    add_subnet_layout_arguments(vpc_parser)
     vpc_parser.add_argument(
-        "--vpc-name",
-        required=True,
-        help="Name tag for the VPC (e.g., my-vpc)",
+        "--plan",
+        help="Subnet plan written by plan-subnets, replaces --vpc-cidr and "
+        "--num-subnets",
     )
     vpc_parser.add_argument(
-        "--vpc-cidr",
-        required=True,
-        help="CIDR block for the VPC (e.g., 10.0.0.0/16)",
+        "--max-workers",
+        type=int,
+        default=10,
+        help="Subnet/route table operations run in parallel (default: 10)",
     )
     vpc_parser.add_argument(
-        "--num-subnets",
+        "--api-rate",
+        type=float,
+        default=10,
+        help="Maximum EC2 API calls per second while provisioning (default: 10)",
+    )
+    vpc_parser.add_argument(
+        "--route-tables",
+        choices=ROUTE_TABLE_TOPOLOGIES,
+        default="per-subnet",
+        help="Route table per subnet, or one shared public table and one private "
+        "table per AZ (default: per-subnet)",
+    )
+    add_regions_argument(vpc_parser)
+
+    plan_parser = subparsers.add_parser(
+        "plan-subnets",
+        help="Plan subnet CIDRs and AZs as JSON without creating anything",
+    )
+    add_subnet_layout_arguments(plan_parser)
+    plan_parser.add_argument(
+        "--azs",
+        help="Comma-separated AZs to spread over, skips the AWS lookup "
+        "(e.g., us-east-1a,us-east-1b)",
+    )
+    plan_parser.add_argument(
+        "--output",
+        help="File to write the plan to (default: print it)",
+    )
+
+    for command, help_text in (
+        ("plan", "Show the changes needed to make a VPC match its spec"),
+        ("apply", "Create whatever a VPC is missing compared to its spec"),
+    ):
+        state_parser = subparsers.add_parser(
+            command, help=help_text, allow_abbrev=False
+        )
+        state_parser.add_argument(
+            "--spec",
+            required=True,
+            help="Desired-state file (.json, or .yaml/.yml with PyYAML)",
+        )
+        state_parser.add_argument(
+            "--max-workers",
+            type=int,
+            default=10,
+            help="Changes applied in parallel (default: 10)",
+        )
+        state_parser.add_argument(
+            "--api-rate",
+            type=float,
+            default=10,
+            help="Maximum EC2 API calls per second while applying (default: 10)",
+        )
+        add_regions_argument(state_parser)
+
+    inventory_parser = subparsers.add_parser(
+        "inventory",
+        help="Report VPC resources from a local cache of bulk describe calls",
+        allow_abbrev=False,
+    )
+    inventory_parser.add_argument(
+        "--ttl",
         type=int,
-        required=True,
-        help="Number of public/private subnet pairs to create (max 200)",
+        default=INVENTORY_TTL,
+        help=f"Seconds before the cache is refreshed (default: {INVENTORY_TTL})",
+    )
+    inventory_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Refresh the cache even if it is still fresh",
+    )
+    inventory_parser.add_argument(
+        "--kind",
+        choices=list(INVENTORY_KINDS),
+        help="List resources of one kind instead of the per-VPC summary",
+    )
+    inventory_parser.add_argument(
+        "--vpc-id",
+        help="List only resources in this VPC",
+    )
+    inventory_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the cached data as JSON",
+    )
+    add_regions_argument(inventory_parser)
+
+    regions_parser = subparsers.add_parser(
+        "regions",
+        help="Cache the AZs, default VPC and latest AMIs of one or more regions",
+    )
+    regions_parser.add_argument(
+        "regions",
+        nargs="*",
+        help="Regions to cache (default: aws_region_name)",
+    )
+    regions_parser.add_argument(
+        "--ttl",
+        type=int,
+        default=REGION_CACHE_TTL,
+        help=f"Seconds before a region is described again "
+        f"(default: {REGION_CACHE_TTL})",
+    )
+    regions_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Describe the regions even if their cache is fresh",
+    )
+
+    destroy_parser = subparsers.add_parser(
+        "destroy",
+        help="Delete a VPC with its instances, databases, subnets and gateways",
+    )
+    destroy_parser.add_argument(
+        "vpc",
+        help="ID or Name tag of the VPC to delete",
+    )
+    destroy_parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="Actually delete, otherwise only list what would be deleted",
+    )
+    destroy_parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=10,
+        help="Deletions run in parallel (default: 10)",
+    )
+    destroy_parser.add_argument(
+        "--api-rate",
+        type=float,
+        default=10,
+        help="Maximum EC2 API calls per second while deleting (default: 10)",
     )
 
     ec2_parser = subparsers.add_parser(
@@ -937,7 +2756,7 @@ def main():
     )
     ec2_parser.add_argument(
         "vpc_id",
-        help="VPC ID where the instance will be created",
+        help="VPC ID where the instance will be created, or 'default'",
     )
     ec2_parser.add_argument(
         "subnet_id",
@@ -965,7 +2784,7 @@ def main():
     )
     rds_parser.add_argument(
         "vpc_id",
-        help="VPC ID where the RDS instance will be created",
+        help="VPC ID where the RDS instance will be created, or 'default'",
     )
     rds_parser.add_argument(
         "subnet_ids",
@@ -1021,10 +2840,41 @@ def main():
         help="Identifier for the new snapshot",
     )
 
+    tag_parser = subparsers.add_parser(
+        "tag-resources",
+        help="Apply tags to existing resources in bulk",
+    )
+    tag_parser.add_argument(
+        "resource_ids",
+        nargs="+",
+        help="IDs of the resources to tag (vpc-..., subnet-..., rtb-..., etc.)",
+    )
+    tag_parser.add_argument(
+        "--tag",
+        action="append",
+        required=True,
+        metavar="KEY=VALUE",
+        help="Tag to apply, can be repeated (e.g., --tag Project=btu)",
+    )
+
     args = parser.parse_args()
 
+    if args.command == "create-vpc" and args.regions and args.plan:
+        # a subnet plan names the AZs of the one region it was made for
+        print("Error: --plan cannot be used with --regions")
+        exit(1)
+
+    if (
+        args.command in FAN_OUT_COMMANDS
+        and args.regions
+        and not os.getenv(FAN_OUT_CHILD_ENV)
+    ):
+        exit(fan_out_regions(args.regions, sys.argv[1:]))
+
     if args.command == "create-vpc":
         manage_vpc_infrastructure(args)
+    elif args.command == "plan-subnets":
+        plan_subnet_layout(args)
     elif args.command == "create-ec2":
         manage_ec2_infrastructure(args)
     elif args.command == "create-rds":
@@ -1035,6 +2885,16 @@ def main():
         list_dynamodb_tables(args)
     elif args.command == "create-rds-snapshot":
         create_rds_snapshot(args)
+    elif args.command in ("plan", "apply"):
+        manage_vpc_state(args)
+    elif args.command == "inventory":
+        show_inventory(args)
+    elif args.command == "regions":
+        show_regions(args)
+    elif args.command == "destroy":
+        destroy_vpc(args)
+    elif args.command == "tag-resources":
+        tag_existing_resources(args)
     else:
         parser.print_help()
 
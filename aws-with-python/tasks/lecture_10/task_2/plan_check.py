@@ -0,0 +1,148 @@
+"""Property checks and timings for the subnet planner in main.py.
+
+Random layouts are planned for every VPC size from /8 down to /28 and each
+plan is checked against ipaddress, independently of validate_plan:
+subnets are aligned, inside the VPC, clear of reserved ranges and of each
+other, spread evenly over AZs, and anything that fits is placed.
+
+    python plan_check.py
+    python plan_check.py --trials 500 --seed 7
+"""
+
+import argparse
+import ipaddress
+import random
+import statistics
+import time
+
+from main import SUBNET_PREFIXES, pair_subnet_requests, plan_subnets
+
+AZS = ["us-east-1a", "us-east-1b", "us-east-1c"]
+
+
+def random_layout(rng, vpc_cidr):
+    """Random subnet requests and reserved ranges for a VPC."""
+    vpc = ipaddress.ip_network(vpc_cidr)
+    smallest_prefix = max(vpc.prefixlen, SUBNET_PREFIXES[0])
+
+    reserved = []
+    if rng.random() < 0.5 and vpc.prefixlen < SUBNET_PREFIXES[1]:
+        prefix = rng.randint(vpc.prefixlen + 1, 32)
+        block = rng.randrange(1 << (prefix - vpc.prefixlen))
+        address = vpc.network_address + (block << (32 - prefix))
+        reserved.append(f"{address}/{prefix}")
+
+    # mostly layouts that fit, with the occasional one that overflows
+    subnets = []
+    total = 0
+    for _ in range(rng.randint(1, 40)):
+        prefix = rng.randint(smallest_prefix, SUBNET_PREFIXES[1])
+        size = 1 << (32 - prefix)
+        if total + size > vpc.num_addresses and rng.random() < 0.95:
+            continue
+        total += size
+        subnets.append(
+            {
+                "name": f"subnet-{len(subnets)}",
+                "prefix": prefix,
+                "public": rng.random() < 0.5,
+            }
+        )
+    return subnets, reserved
+
+
+def check_plan(vpc_cidr, subnets, reserved, plan):
+    vpc = ipaddress.ip_network(vpc_cidr)
+    networks = [ipaddress.ip_network(subnet["cidr"]) for subnet in plan["subnets"]]
+    reserved_networks = [ipaddress.ip_network(cidr) for cidr in reserved]
+
+    assert [subnet["name"] for subnet in plan["subnets"]] == [
+        subnet["name"] for subnet in subnets
+    ], "plan does not keep the request order"
+    for network, subnet in zip(networks, subnets):
+        assert network.prefixlen == subnet["prefix"], f"{network} has the wrong size"
+        assert network.subnet_of(vpc), f"{network} is outside {vpc}"
+        for other in reserved_networks:
+            assert not network.overlaps(other), f"{network} overlaps reserved {other}"
+
+    ordered = sorted(networks)
+    for previous, current in zip(ordered, ordered[1:]):
+        assert not previous.overlaps(current), f"{previous} overlaps {current}"
+
+    for public in (True, False):
+        counts = [
+            sum(
+                1
+                for subnet in plan["subnets"]
+                if subnet["public"] == public and subnet["az"] == az
+            )
+            for az in AZS
+        ]
+        assert max(counts) - min(counts) <= 1, f"uneven AZ spread {counts}"
+
+    used = sum(network.num_addresses for network in networks)
+    held = sum(network.num_addresses for network in reserved_networks)
+    assert plan["free_addresses"] == vpc.num_addresses - used - held
+
+
+def check_prefix(rng, vpc_prefix, trials):
+    """Returns (plans checked, layouts that did not fit, planning times)."""
+    vpc_cidr = f"10.0.0.0/{vpc_prefix}"
+    vpc_size = 1 << (32 - vpc_prefix)
+    checked, rejected, timings = 0, 0, []
+
+    for _ in range(trials):
+        subnets, reserved = random_layout(rng, vpc_cidr)
+        started = time.perf_counter()
+        try:
+            plan = plan_subnets(vpc_cidr, subnets, AZS, reserved)
+        except ValueError:
+            # power-of-two blocks placed largest first always fit when
+            # nothing is reserved and the total is within the VPC
+            total = sum(1 << (32 - subnet["prefix"]) for subnet in subnets)
+            assert (
+                reserved or total > vpc_size
+            ), f"{vpc_cidr} rejected a layout that fits"
+            rejected += 1
+            continue
+        timings.append(time.perf_counter() - started)
+
+        check_plan(vpc_cidr, subnets, reserved, plan)
+        assert plan == plan_subnets(vpc_cidr, subnets, AZS, reserved), "not stable"
+        checked += 1
+
+    return checked, rejected, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the subnet planner")
+    parser.add_argument("--trials", type=int, default=200, help="Layouts per size")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(1 << 32)
+    rng = random.Random(seed)
+    print(f"seed {seed}")
+
+    for vpc_prefix in range(8, 29):
+        checked, rejected, timings = check_prefix(rng, vpc_prefix, args.trials)
+        median = statistics.median(timings) * 1000 if timings else 0
+        print(
+            f"/{vpc_prefix:<3} {checked:5} plans ok  {rejected:5} too full  "
+            f"median {median:6.3f} ms"
+        )
+
+    for vpc_cidr, pairs in (("10.0.0.0/16", 200), ("10.0.0.0/8", 200)):
+        subnets = pair_subnet_requests("bench", vpc_cidr, pairs)
+        started = time.perf_counter()
+        plan = plan_subnets(vpc_cidr, subnets, AZS)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(
+            f"{pairs} pairs in {vpc_cidr}: {len(plan['subnets'])} subnets "
+            f"planned in {elapsed:.2f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,12 +1,21 @@
 import argparse
 import boto3
+import hashlib
 import os
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from os import getenv
 from dotenv import load_dotenv
 from typing import Optional
+from urllib.parse import unquote, urlsplit
 
 load_dotenv()
 
+WEBSITE_CONFIGURATION = {
+    # "ErrorDocument": {"Key": "error.html"},
+    "IndexDocument": {"Suffix": "index.html"},
+}
+
 
 def init_client(region: Optional[str] = None):
     """Initialize an S3 client with credentials from environment variables."""
@@ -44,14 +53,9 @@ def create_bucket(s3_client, bucket_name: str, region: Optional[str] = None):
 
 def configure_website(s3_client, bucket_name: str):
     """Configure the bucket for static website hosting."""
-    website_configuration = {
-        # "ErrorDocument": {"Key": "error.html"},
-        "IndexDocument": {"Suffix": "index.html"},
-    }
-
     s3_client.put_bucket_website(
         Bucket=bucket_name,
-        WebsiteConfiguration=website_configuration,
+        WebsiteConfiguration=WEBSITE_CONFIGURATION,
     )
     print(f"Bucket {bucket_name} configured for website hosting")
 
@@ -103,6 +107,19 @@ def set_bucket_policy(s3_client, bucket_name: str):
         print("You may need to manually configure permissions in the AWS S3 console.")
 
 
+def get_content_type(file: str) -> str:
+    """Return the Content-Type the uploader assigns to a file."""
+    if file.endswith(".css"):
+        return "text/css"
+    elif file.endswith(".js"):
+        return "application/javascript"
+    elif file.endswith(".jpg") or file.endswith(".jpeg"):
+        return "image/jpeg"
+    elif file.endswith(".png"):
+        return "image/png"
+    return "text/html"
+
+
 def upload_local_directory(s3_client, bucket_name: str, directory_path: str):
     """Upload all files from a local directory to S3 bucket."""
     uploaded_files = []
@@ -112,15 +129,7 @@ def upload_local_directory(s3_client, bucket_name: str, directory_path: str):
             local_path = os.path.join(root, file)
             relative_path = os.path.relpath(local_path, directory_path)
 
-            content_type = "text/html"
-            if file.endswith(".css"):
-                content_type = "text/css"
-            elif file.endswith(".js"):
-                content_type = "application/javascript"
-            elif file.endswith(".jpg") or file.endswith(".jpeg"):
-                content_type = "image/jpeg"
-            elif file.endswith(".png"):
-                content_type = "image/png"
+            content_type = get_content_type(file)
 
             s3_client.upload_file(
                 Filename=local_path,
@@ -143,25 +152,119 @@ def get_website_url(bucket_name: str, region: Optional[str] = None):
         return f"http://{bucket_name}.s3-website-{region}.amazonaws.com"
 
 
+class PreviewHandler(BaseHTTPRequestHandler):
+    """Serve a local directory using S3 website endpoint routing."""
+
+    source = "."
+    server_version = "AmazonS3"
+    sys_version = ""
+
+    def do_GET(self):
+        self.send_object(include_body=True)
+
+    def do_HEAD(self):
+        self.send_object(include_body=False)
+
+    def resolve_key(self, key: str) -> Optional[str]:
+        """Return the local path for an object key, or None if missing."""
+        path = os.path.realpath(os.path.join(self.source, key))
+        if not path.startswith(os.path.realpath(self.source) + os.sep):
+            return None
+        return path if os.path.isfile(path) else None
+
+    def send_object(self, include_body: bool):
+        key = unquote(urlsplit(self.path).path).lstrip("/")
+        index_suffix = WEBSITE_CONFIGURATION["IndexDocument"]["Suffix"]
+
+        if key == "" or key.endswith("/"):
+            key += index_suffix
+        elif not self.resolve_key(key) and self.resolve_key(f"{key}/{index_suffix}"):
+            # S3 redirects "folder" to "folder/" when folder/index exists
+            self.send_response(302)
+            self.send_header("Location", f"/{key}/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        status = 200
+        path = self.resolve_key(key)
+        if path is None:
+            status = 404
+            error_document = WEBSITE_CONFIGURATION.get("ErrorDocument", {}).get("Key")
+            path = self.resolve_key(error_document) if error_document else None
+
+        if path is None:
+            body = b"<html><body><h1>404 Not Found</h1></body></html>"
+            self.send_response(404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if include_body:
+                self.wfile.write(body)
+            return
+
+        with open(path, "rb") as file:
+            body = file.read()
+
+        self.send_response(status)
+        self.send_header("Content-Type", get_content_type(os.path.basename(path)))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", f'"{hashlib.md5(body).hexdigest()}"')
+        self.send_header(
+            "Last-Modified", formatdate(os.path.getmtime(path), usegmt=True)
+        )
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+
+def preview_website(source: str, port: int = 8000):
+    """Serve the source directory locally, routed like the S3 website."""
+    handler = type("SourcePreviewHandler", (PreviewHandler,), {"source": source})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+
+    print(f"Previewing {source} at http://127.0.0.1:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Host a website on Amazon S3")
-    parser.add_argument("command", choices=["host"], help="Command to execute")
-    parser.add_argument("bucket_name", help="Name of the S3 bucket to create")
+    parser.add_argument(
+        "command", choices=["host", "preview"], help="Command to execute"
+    )
+    parser.add_argument(
+        "bucket_name", nargs="?", help="Name of the S3 bucket to create"
+    )
     parser.add_argument(
         "--source", required=True, help="Local directory with website files"
     )
     parser.add_argument(
         "--region", default=None, help="AWS region (default: us-east-1)"
     )
+    parser.add_argument(
+        "--port", type=int, default=8000, help="Preview server port (default: 8000)"
+    )
 
     args = parser.parse_args()
 
+    if not os.path.isdir(args.source):
+        print(
+            f"Error: Source directory '{args.source}' not found or is not a directory"
+        )
+        return 1
+
+    if args.command == "preview":
+        preview_website(args.source, args.port)
+
     if args.command == "host":
-        if not os.path.isdir(args.source):
-            print(
-                f"Error: Source directory '{args.source}' not found or is not a directory"
-            )
-            return 1
+        if not args.bucket_name:
+            parser.error("bucket_name is required for host")
 
         s3_client = init_client(args.region)
 
@@ -2,21 +2,36 @@ import argparse
 import boto3
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
+import gzip
+from http.client import HTTPSConnection
+import io
 import json
+import os
 from os import getenv
-from time import localtime
+from random import choice
+from time import localtime, strftime, time
 from typing import Optional
 from urllib.parse import quote
 from urllib.request import Request, urlopen
 from uuid import uuid4
 
-
 load_dotenv()
 
 headers = {
     "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36",
 }
 
+QUOTES_API_HOST = "api.quotable.kurokeita.dev"
+QUOTES_CACHE_PATH = getenv("quotes_cache_path", ".quotes_cache.json")
+QUOTES_CACHE_TTL = 24 * 60 * 60
+ARCHIVE_FORMATS = {
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "gzip": ("ndjson.gz", "application/gzip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+verified_buckets = set()
+
 
 def init_client(region: Optional[str] = None):
     """Initialize an S3 client with credentials from environment variables."""
@@ -43,35 +58,247 @@ def bucket_exists(s3_client, bucket_name: str) -> bool:
         return False
 
 
-def save_quote_to_s3(s3_client, bucket_name: str, quote_data: dict):
-    """Save a quote to an S3 bucket as a JSON file."""
+def ensure_bucket(s3_client, bucket_name: str) -> bool:
+    """Check the bucket once per session and remember that it exists."""
+    if bucket_name in verified_buckets:
+        return True
+    if bucket_exists(s3_client, bucket_name):
+        verified_buckets.add(bucket_name)
+        return True
+    return False
+
+
+def encode_quotes(quotes: list, archive_format: str = "ndjson") -> bytes:
+    """Serialize quotes into one compact archive object body."""
+    if archive_format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet archives require the pyarrow package")
+
+        rows = [
+            {
+                "id": each["quote"].get("id"),
+                "content": each["quote"]["content"],
+                "author": each["quote"]["author"]["name"],
+            }
+            for each in quotes
+        ]
+        buffer = io.BytesIO()
+        pq.write_table(pa.Table.from_pylist(rows), buffer, compression="snappy")
+        return buffer.getvalue()
+
+    body = "".join(
+        json.dumps(each, separators=(",", ":")) + "\n" for each in quotes
+    ).encode()
+    return gzip.compress(body) if archive_format == "gzip" else body
+
+
+def save_quotes_batch_to_s3(
+    s3_client,
+    bucket_name: str,
+    quotes: list,
+    archive_format: str = "ndjson",
+    batch_size: int = 1000,
+):
+    """Save quotes rolled up into a few NDJSON/gzip/Parquet objects."""
     if not s3_client:
         print("Error: S3 client not initialized")
-        return False
+        return []
 
-    if not bucket_exists(s3_client, bucket_name):
+    if not ensure_bucket(s3_client, bucket_name):
         print(f"Error: Bucket {bucket_name} does not exist or is not accessible")
-        return False
+        return []
+
+    extension, content_type = ARCHIVE_FORMATS[archive_format]
+    prefix = strftime("quotes/%Y/%m/%d", localtime())
+    saved_keys = []
+
+    for start in range(0, len(quotes), batch_size):
+        batch = quotes[start : start + batch_size]
+        file_name = f"{prefix}/batch_{uuid4()}.{extension}"
+
+        try:
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Key=file_name,
+                Body=encode_quotes(batch, archive_format),
+                ContentType=content_type,
+            )
+        except ClientError as e:
+            print(f"Error saving quote batch to S3: {e}")
+            break
+
+        saved_keys.append(file_name)
+        print(f"{len(batch)} quotes saved to s3://{bucket_name}/{file_name}")
+
+    return saved_keys
+
+
+def last_quote_page(result: dict, served: int) -> Optional[int]:
+    """Last page number from the API's pagination metadata, if it has any.
+
+    The page count is derived from the number of quotes actually served,
+    so a server that caps ``limit`` below the requested page size is still
+    paged through completely.
+    """
+    metadata = result.get("metadata") or result.get("meta") or {}
+    for key in ("lastPage", "last_page", "totalPages", "total_pages"):
+        if metadata.get(key) is not None:
+            return int(metadata[key])
+    for key in ("total", "totalCount", "total_count"):
+        if metadata.get(key) is not None:
+            return -(-int(metadata[key]) // served)
+    return None
+
+
+def fetch_all_quotes(page_size: int = 100) -> list:
+    """Download every quote page over a single keep-alive HTTPS connection.
+
+    Raises RuntimeError on an error response or if no quotes come back, so
+    a failed refresh never replaces the cache with an empty one.
+    """
+    connection = HTTPSConnection(QUOTES_API_HOST, timeout=30)
+    quotes = []
+    page = 1
 
     try:
-        file_name = f"quote_{uuid4()}.json"
-        json_data = json.dumps(quote_data, indent=2)
-
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=file_name,
-            Body=json_data,
-            ContentType="application/json",
-        )
+        while True:
+            connection.request(
+                "GET", f"/api/quotes?page={page}&limit={page_size}", headers=headers
+            )
+            response = connection.getresponse()
+            body = response.read().decode()
+            if response.status != 200:
+                raise RuntimeError(
+                    f"Quotes API returned HTTP {response.status} for page {page}"
+                )
 
-        print(f"Quote saved to s3://{bucket_name}/{file_name}")
-        return True
-    except ClientError as e:
-        print(f"Error saving quote to S3: {e}")
-        return False
+            result = json.loads(body)
+            if isinstance(result, dict) and "data" not in result:
+                raise RuntimeError(f"Unexpected quotes API response: {body[:200]}")
+            batch = result["data"] if isinstance(result, dict) else result
+
+            if not batch:
+                if page == 1:
+                    raise RuntimeError("Quotes API returned no quotes")
+                break
+            quotes.extend(batch)
+
+            # without pagination metadata, page until an empty page
+            last_page = (
+                last_quote_page(result, len(batch))
+                if isinstance(result, dict)
+                else None
+            )
+            if last_page is not None and page >= last_page:
+                break
+            page += 1
+    finally:
+        connection.close()
+
+    return quotes
+
+
+def build_author_index(quotes: list) -> dict:
+    """Map lower-cased author names to the positions of their quotes."""
+    authors = {}
+    for index, each in enumerate(quotes):
+        name = each["author"]["name"].lower()
+        authors.setdefault(name, []).append(index)
+    return authors
+
+
+def load_quote_cache(ttl: int = QUOTES_CACHE_TTL, allow_stale: bool = False):
+    """Return the on-disk quote cache if it exists and is fresh enough."""
+    try:
+        with open(QUOTES_CACHE_PATH) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if not allow_stale and time() - cache.get("fetched_at", 0) > ttl:
+        return None
+    return cache
+
+
+def refresh_quote_cache():
+    """Warm the quote cache in bulk and write it to disk atomically."""
+    quotes = fetch_all_quotes()
+    cache = {
+        "fetched_at": time(),
+        "quotes": quotes,
+        "authors": build_author_index(quotes),
+    }
 
+    temp_path = f"{QUOTES_CACHE_PATH}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(cache, file)
+    os.replace(temp_path, QUOTES_CACHE_PATH)
 
-def get_quote(author: Optional[str] = None):
+    print(f"Cached {len(quotes)} quotes in {QUOTES_CACHE_PATH}")
+    return cache
+
+
+def get_quote_cache(ttl: int = QUOTES_CACHE_TTL, refresh: bool = False):
+    """Return a usable quote cache, refreshing it when expired.
+
+    A stale cache is still served if the API cannot be reached, so quotes
+    keep working offline.
+    """
+    cache = None if refresh else load_quote_cache(ttl)
+    if cache:
+        return cache
+
+    try:
+        return refresh_quote_cache()
+    except Exception as e:
+        print(f"Error refreshing quote cache: {e}")
+        return load_quote_cache(allow_stale=True)
+
+
+def get_cached_quote(cache: dict, author: Optional[str] = None):
+    """Pick a random quote from the cache, optionally by author."""
+    if author:
+        indices = cache["authors"].get(author.lower())
+        if not indices:
+            return None
+        return {"quote": cache["quotes"][choice(indices)]}
+
+    if not cache["quotes"]:
+        return None
+    return {"quote": choice(cache["quotes"])}
+
+
+def get_quotes(
+    author: Optional[str] = None,
+    count: int = 1,
+    ttl: int = QUOTES_CACHE_TTL,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> list:
+    """Return up to count random quotes, all drawn from one load of the cache.
+
+    Authors the cache does not know are still looked up in the API, one
+    request per quote, stopping at the first request that fails.
+    """
+    if use_cache:
+        cache = get_quote_cache(ttl, refresh)
+        if cache and (not author or cache["authors"].get(author.lower())):
+            quotes = [get_cached_quote(cache, author) for _ in range(count)]
+            return [each for each in quotes if each]
+
+    quotes = []
+    for _ in range(count):
+        fetched = fetch_quote(author)
+        if not fetched:
+            break
+        quotes.append(fetched)
+    return quotes
+
+
+def fetch_quote(author: Optional[str] = None):
     """Generic function to fetch data from the quotes API."""
     base_url = "https://api.quotable.kurokeita.dev/api/quotes/random"
     url = f"{base_url}?author={quote(author)}" if author else base_url
@@ -92,6 +319,14 @@ def print_quote(quote: dict):
     print(quote["quote"]["author"]["name"])
 
 
+def positive_int(value: str) -> int:
+    """argparse type for counts and sizes that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="CLI program for fetching and managing inspirational quotes."
@@ -117,27 +352,83 @@ def main():
         help="Save the quote to the specified S3 bucket",
     )
 
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=QUOTES_CACHE_TTL,
+        help="Seconds before the local quote cache is refreshed (default: 86400)",
+    )
+
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Re-download all quotes into the local cache",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always ask the quotes API instead of the local cache",
+    )
+
+    parser.add_argument(
+        "--count",
+        type=positive_int,
+        default=1,
+        help="Number of quotes to fetch; with --save they are archived in batches",
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=list(ARCHIVE_FORMATS),
+        default="ndjson",
+        help="Archive object format for batch saves (default: ndjson)",
+    )
+
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=1000,
+        help="Quotes per archive object for batch saves (default: 1000)",
+    )
+
     args = parser.parse_args()
 
     if args.inspire is not None:
-        if args.inspire is True:
-            quote = get_quote()
-        else:
-            quote = get_quote(args.inspire)
+        author = None if args.inspire is True else args.inspire
+        quotes = get_quotes(
+            author,
+            args.count,
+            ttl=args.cache_ttl,
+            use_cache=not args.no_cache,
+            refresh=args.refresh_cache,
+        )
 
-        if quote:
-            print_quote(quote)
+        if quotes:
+            for index, each in enumerate(quotes):
+                if index:
+                    print()
+                print_quote(each)
 
             if args.save:
                 if args.bucket_name:
                     s3_client = init_client()
-                    save_quote_to_s3(s3_client, args.bucket_name, quote)
+                    save_quotes_batch_to_s3(
+                        s3_client,
+                        args.bucket_name,
+                        quotes,
+                        args.format,
+                        args.batch_size,
+                    )
                 else:
                     print("Error: Bucket name is required with --save flag")
         else:
             print("No quotes found.")
         return
 
+    if args.refresh_cache:
+        refresh_quote_cache()
+
 
 if __name__ == "__main__":
     main()
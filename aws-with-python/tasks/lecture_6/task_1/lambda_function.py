@@ -1,10 +1,13 @@
-import io
+import hashlib
 import json
 import os
+import time
 import urllib.parse
-from urllib.request import Request, urlopen
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import boto3
+import urllib3
+from botocore.exceptions import ClientError
 
 API_TOKEN = os.environ.get("API_TOKEN")
 MODELS = {
@@ -13,61 +16,255 @@ MODELS = {
     "mit": "nvidia/mit-b0",
     "yolos": "hustvl/yolos-tiny",
 }
+MODEL_TIMEOUT = float(os.environ.get("MODEL_TIMEOUT", "25"))
+RECORD_CONCURRENCY = int(os.environ.get("RECORD_CONCURRENCY", "4"))
+# results are cached per (image content hash, model): in DynamoDB with TTL
+# when CACHE_TABLE is set, otherwise as objects under CACHE_PREFIX in S3
+CACHE_TABLE = os.environ.get("CACHE_TABLE")
+CACHE_PREFIX = os.environ.get("CACHE_PREFIX", "cache")
+CACHE_TTL_DAYS = int(os.environ.get("CACHE_TTL_DAYS", "30"))
+DYNAMODB_ITEM_LIMIT = 350 * 1024
+INFERENCE_HOST = "api-inference.huggingface.co"
+MODEL_RETRIES = int(os.environ.get("MODEL_RETRIES", "4"))
 
 
 s3_client = boto3.client("s3")
+dynamodb_client = boto3.client("dynamodb") if CACHE_TABLE else None
+# created once per container, so warm invocations reuse the threads
+record_executor = ThreadPoolExecutor(max_workers=RECORD_CONCURRENCY)
+model_executor = ThreadPoolExecutor(max_workers=len(MODELS) * RECORD_CONCURRENCY)
+# keep-alive connections to the inference API, shared by every model call,
+# record and warm invocation; one connection per model thread
+inference_pool = urllib3.HTTPSConnectionPool(
+    INFERENCE_HOST,
+    maxsize=len(MODELS) * RECORD_CONCURRENCY,
+    block=True,
+    retries=False,
+)
 
 
-def query_image(image_data, model_url, image_content_type):
+def model_loading_delay(response, attempt):
+    """Seconds to wait before retrying a 503 "model is loading" response."""
+    backoff = min(2**attempt, 10)
+    try:
+        estimated_time = float(json.loads(response.data).get("estimated_time", 0))
+    except (ValueError, AttributeError):
+        estimated_time = 0
+    return min(max(backoff, estimated_time), 20)
+
+
+def query_image(image_data, model_url, image_content_type, deadline):
+    """POST the image to a model, giving up at deadline (time.monotonic()).
+
+    Waiting for a pooled connection, connecting and reading all count
+    against the deadline, so a call never outlives the invocation.
+    """
     headers = {
         "Authorization": f"Bearer {API_TOKEN}",
         "Content-Type": image_content_type,
     }
-    api_url = f"https://api-inference.huggingface.co/models/{model_url}"
-    http_request = Request(api_url, data=image_data, headers=headers)
 
-    with urlopen(http_request) as response:
-        result = response.read().decode()
-    return result
+    for attempt in range(MODEL_RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Model {model_url} timed out after {MODEL_TIMEOUT}s")
+        response = inference_pool.request(
+            "POST",
+            f"/models/{model_url}",
+            body=image_data,
+            headers=headers,
+            timeout=urllib3.Timeout(total=remaining),
+            pool_timeout=remaining,
+        )
+
+        if response.status == 503 and attempt < MODEL_RETRIES:
+            delay = model_loading_delay(response, attempt)
+            if time.monotonic() + delay < deadline:
+                print(f"Model {model_url} is loading, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+        if response.status >= 400:
+            raise RuntimeError(
+                f"Inference API returned {response.status}: {response.data[:200]!r}"
+            )
+        # raw JSON bytes, uploaded as-is without a decode/encode round trip
+        return response.data
+
+
+def cache_key(image_hash, model_name):
+    return f"{CACHE_PREFIX}/{model_name}/{image_hash}.json"
+
+
+def load_cached_result(bucket, image_hash, model_name, result_key):
+    """Write a cached result to result_key, returning False on a cache miss."""
+    if dynamodb_client:
+        response = dynamodb_client.get_item(
+            TableName=CACHE_TABLE,
+            Key={"cacheKey": {"S": f"{model_name}#{image_hash}"}},
+        )
+        item = response.get("Item")
+        # DynamoDB TTL deletion is lazy, so expired items can still be read
+        if not item or int(item["expiresAt"]["N"]) < time.time():
+            return False
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=result_key,
+            Body=item["result"]["B"],
+            ContentType="application/json",
+        )
+        return True
+
+    try:
+        # server-side copy, the cached result never passes through the Lambda
+        s3_client.copy_object(
+            Bucket=bucket,
+            Key=result_key,
+            CopySource={"Bucket": bucket, "Key": cache_key(image_hash, model_name)},
+            ContentType="application/json",
+            MetadataDirective="REPLACE",
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return False
+        raise
+
+
+def store_cached_result(bucket, image_hash, model_name, result):
+    if dynamodb_client:
+        if len(result) > DYNAMODB_ITEM_LIMIT:
+            return
+        dynamodb_client.put_item(
+            TableName=CACHE_TABLE,
+            Item={
+                "cacheKey": {"S": f"{model_name}#{image_hash}"},
+                "result": {"B": result},
+                "expiresAt": {"N": str(int(time.time()) + CACHE_TTL_DAYS * 86400)},
+            },
+        )
+        return
+
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=cache_key(image_hash, model_name),
+        Body=result,
+        ContentType="application/json",
+    )
+
+
+def process_model(
+    image_data,
+    image_hash,
+    model_name,
+    model_url,
+    content_type,
+    bucket,
+    image_name,
+    deadline,
+):
+    result_key = f"json/{model_name}_{image_name}.json"
+
+    if load_cached_result(bucket, image_hash, model_name, result_key):
+        print(f"Cache hit for model {model_name}, copied result to {result_key}")
+        return result_key
+
+    print(f"Processing with model: {model_name}")
+
+    # image_data is immutable bytes shared by all model threads, no copies
+    result = query_image(image_data, model_url, content_type, deadline)
+
+    s3_client.put_object(
+        Bucket=bucket, Key=result_key, Body=result, ContentType="application/json"
+    )
+    print(f"Uploaded result to {result_key}")
+
+    try:
+        store_cached_result(bucket, image_hash, model_name, result)
+    except ClientError as e:
+        print(f"Warning: could not cache result for model {model_name}: {e}")
+    return result_key
+
+
+def process_record(record):
+    bucket = record.get("s3").get("bucket").get("name")
+    key = urllib.parse.unquote_plus(record.get("s3").get("object").get("key"))
+
+    print(f"Processing image from Bucket: {bucket}, Key: {key}")
+
+    if not key.lower().endswith((".jpg", ".jpeg", ".png")):
+        print(f"Skipping non-image file: {key}")
+        return
+
+    image_name = os.path.basename(key).split(".")[0]
+    image_extension = os.path.splitext(key)[1].lower()
+    content_type = {
+        ".png": "image/png",
+        ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg",
+    }.get(image_extension, "application/octet-stream")
+
+    image_data = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    image_hash = hashlib.sha256(image_data).hexdigest()
+
+    # one deadline for all models, so calls queued behind other records'
+    # models do not get a fresh MODEL_TIMEOUT when they finally start
+    deadline = time.monotonic() + MODEL_TIMEOUT
+    futures = {
+        model_executor.submit(
+            process_model,
+            image_data,
+            image_hash,
+            model_name,
+            model_url,
+            content_type,
+            bucket,
+            image_name,
+            deadline,
+        ): model_name
+        for model_name, model_url in MODELS.items()
+    }
+    # query_image stops at the deadline, the margin covers the S3 calls
+    done, not_done = wait(futures, timeout=MODEL_TIMEOUT * 2)
+
+    failed_models = []
+    for future in done:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error processing with model {futures[future]}: {str(e)}")
+            failed_models.append(futures[future])
+    for future in not_done:
+        # queued calls never start; running ones end at their deadline
+        future.cancel()
+        print(f"Timed out processing with model {futures[future]}")
+        failed_models.append(futures[future])
+
+    if failed_models:
+        raise RuntimeError(f"Models failed for {key}: {', '.join(failed_models)}")
 
 
 def lambda_handler(event, _):
-    for record in event.get("Records"):
-        bucket = record.get("s3").get("bucket").get("name")
-        key = urllib.parse.unquote_plus(record.get("s3").get("object").get("key"))
-
-        print(f"Processing image from Bucket: {bucket}, Key: {key}")
-
-        if not key.lower().endswith((".jpg", ".jpeg", ".png")):
-            print(f"Skipping non-image file: {key}")
-            continue
-
-        image_name = os.path.basename(key).split(".")[0]
-        image_extension = os.path.splitext(key)[1].lower()
-        content_type = {
-            ".png": "image/png",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-        }.get(image_extension, "application/octet-stream")
-
-        file = io.BytesIO()
-        s3_client.download_fileobj(Bucket=bucket, Key=key, Fileobj=file)
-        file.seek(0)
-        image_data = file.read()
-
-        for model_name, model_url in MODELS.items():
-            try:
-                print(f"Processing with model: {model_name}")
-
-                file_copy = io.BytesIO(image_data)
-                result = query_image(file_copy, model_url, content_type)
-                result_key = f"json/{model_name}_{image_name}.json"
-
-                result_file = io.BytesIO(result.encode("utf-8"))
-                result_file.seek(0)
-                s3_client.upload_fileobj(result_file, bucket, result_key)
-                print(f"Uploaded result to {result_key}")
-            except Exception as e:
-                print(f"Error processing with model {model_name}: {str(e)}")
-
-    return {"statusCode": 200, "body": json.dumps("Done!")}
+    records = event.get("Records") or []
+    futures = {
+        record_executor.submit(process_record, record): record for record in records
+    }
+
+    failed_keys = []
+    for future, record in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            key = record["s3"]["object"]["key"]
+            print(f"Error processing record {key}: {str(e)}")
+            failed_keys.append(key)
+
+    if failed_keys:
+        # S3 invokes asynchronously: a failed invocation is what Lambda
+        # retries and reports, cached model results make the retry cheap
+        raise RuntimeError(
+            f"{len(failed_keys)} of {len(records)} records failed: "
+            + ", ".join(failed_keys)
+        )
+
+    return {"statusCode": 200, "body": json.dumps({"processed": len(records)})}
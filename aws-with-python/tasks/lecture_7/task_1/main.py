@@ -29,22 +29,23 @@ def is_valid_cidr(cidr):
         return False
 
 
-def add_name_tag(client, resource_id, name_value):
-    """Adds a 'Name' tag to an AWS resource."""
-    try:
-        client.create_tags(
-            Resources=[resource_id],
-            Tags=[{"Key": "Name", "Value": name_value}],
-        )
-        print(f"Successfully tagged resource {resource_id} with Name: {name_value}")
-    except Exception as e:
-        print(f"Error tagging resource {resource_id}: {e}")
+def name_tag_specification(resource_type, name_value):
+    """Returns TagSpecifications that set a 'Name' tag at creation time."""
+    return [
+        {
+            "ResourceType": resource_type,
+            "Tags": [{"Key": "Name", "Value": name_value}],
+        }
+    ]
 
 
 def create_vpc(client, vpc_cidr, vpc_name):
-    """Creates a VPC and tags it."""
+    """Creates a VPC tagged with its name."""
     try:
-        result = client.create_vpc(CidrBlock=vpc_cidr)
+        result = client.create_vpc(
+            CidrBlock=vpc_cidr,
+            TagSpecifications=name_tag_specification("vpc", vpc_name),
+        )
         vpc_id = result.get("Vpc", {}).get("VpcId")
 
         if not vpc_id:
@@ -56,8 +57,6 @@ def create_vpc(client, vpc_cidr, vpc_name):
         waiter.wait(VpcIds=[vpc_id])
         print(f"VPC {vpc_id} is now available.")
 
-        add_name_tag(client, vpc_id, vpc_name)
-
         return vpc_id
     except Exception as e:
         print(f"Error creating VPC: {e}")
@@ -65,9 +64,13 @@ def create_vpc(client, vpc_cidr, vpc_name):
 
 
 def create_and_attach_igw(client, vpc_id, vpc_name):
-    """Creates an Internet Gateway, tags it, and attaches it to the VPC."""
+    """Creates a tagged Internet Gateway and attaches it to the VPC."""
     try:
-        result = client.create_internet_gateway()
+        result = client.create_internet_gateway(
+            TagSpecifications=name_tag_specification(
+                "internet-gateway", f"{vpc_name}-IGW"
+            )
+        )
         igw_id = result.get("InternetGateway", {}).get("InternetGatewayId")
 
         if not igw_id:
@@ -75,8 +78,6 @@ def create_and_attach_igw(client, vpc_id, vpc_name):
             exit(1)
         print(f"Internet Gateway created with ID: {igw_id}")
 
-        add_name_tag(client, igw_id, f"{vpc_name}-IGW")
-
         client.attach_internet_gateway(InternetGatewayId=igw_id, VpcId=vpc_id)
         print(f"Attached Internet Gateway {igw_id} to VPC {vpc_id}")
 
@@ -87,9 +88,13 @@ def create_and_attach_igw(client, vpc_id, vpc_name):
 
 
 def create_subnet(client, vpc_id, subnet_cidr, subnet_name_tag):
-    """Creates a subnet within the VPC and tags it."""
+    """Creates a tagged subnet within the VPC."""
     try:
-        result = client.create_subnet(VpcId=vpc_id, CidrBlock=subnet_cidr)
+        result = client.create_subnet(
+            VpcId=vpc_id,
+            CidrBlock=subnet_cidr,
+            TagSpecifications=name_tag_specification("subnet", subnet_name_tag),
+        )
         subnet_id = result.get("Subnet", {}).get("SubnetId")
 
         if not subnet_id:
@@ -103,8 +108,6 @@ def create_subnet(client, vpc_id, subnet_cidr, subnet_name_tag):
         waiter.wait(SubnetIds=[subnet_id])
         print(f"Subnet {subnet_id} is now available.")
 
-        add_name_tag(client, subnet_id, subnet_name_tag)
-
         return subnet_id
     except Exception as e:
         print(f"Error creating subnet {subnet_name_tag} with CIDR {subnet_cidr}: {e}")
@@ -114,7 +117,12 @@ def create_subnet(client, vpc_id, subnet_cidr, subnet_name_tag):
 def create_route_table(client, vpc_id, route_table_name_tag, is_public, igw_id=None):
     """Creates a route table. If public, adds a route to the IGW."""
     try:
-        result = client.create_route_table(VpcId=vpc_id)
+        result = client.create_route_table(
+            VpcId=vpc_id,
+            TagSpecifications=name_tag_specification(
+                "route-table", route_table_name_tag
+            ),
+        )
         rt_id = result.get("RouteTable", {}).get("RouteTableId")
 
         if not rt_id:
@@ -122,8 +130,6 @@ def create_route_table(client, vpc_id, route_table_name_tag, is_public, igw_id=N
             exit(1)
         print(f"Route Table created with ID: {rt_id} for VPC {vpc_id}")
 
-        add_name_tag(client, rt_id, route_table_name_tag)
-
         if is_public:
             if not igw_id:
                 print(